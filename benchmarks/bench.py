@@ -0,0 +1,347 @@
+"""Бенчмарки игры без окна и звука (драйверы SDL dummy).
+
+На каждой сложности меню прогоняются партии с заскриптованным вводом и меряются:
+тики симуляции в секунду, кадры отрисовки в секунду (отрисовщик + масштабирование),
+время фаз кадра, стоимость отдельных функций за вызов и пиковая память. Отдельно
+меряется режим роя (SWARM_GHOSTS призраков): тики и кадры в секунду, а если
+установлен NumPy — ещё и тики векторного движка призраков и тики пакета
+из BATCH_GAMES партий (batch.BatchGames), идущих в ногу.
+Результат пишется в JSON и сравнивается с сохранённым эталоном:
+
+    python benchmarks/bench.py                      # прогон и сравнение с baseline.json
+    python benchmarks/bench.py --save-baseline      # сделать текущий прогон эталоном
+    python benchmarks/bench.py --threshold 0.15     # допустимое ухудшение 15 %
+
+Время фаз и функций (метрики *_us) — медиана REPEATS прогонов; оно сравнивается
+с отдельным, более свободным порогом --phase-threshold и только если ухудшение
+больше NOISE_FLOOR_US микросекунд: на таких малых величинах дрожание между
+запусками велико. Код возврата 1, если хотя бы одна метрика хуже эталона больше чем на порог.
+Эталон зависит от машины, его снимают на той же машине, где собирается релиз, поэтому
+в репозитории его нет; без эталона сравнение не пропускается, а прогон сразу
+завершается ошибкой (код 2), чтобы проверка перед сборкой не проходила впустую.
+"""
+import argparse
+import cProfile
+import json
+import os
+import platform
+import pstats
+import random
+import sys
+import time
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame # noqa
+
+from pacman.settings import LOGICAL_WIDTH, LOGICAL_HEIGHT, RED, PINK, CYAN, ORANGE, BLUE # noqa
+from pacman.engine import GameState, step # noqa
+from pacman.maze import DIRECTIONS # noqa
+from pacman.render import DirtyRenderer, sprites # noqa
+from pacman.display import Presenter # noqa
+from pacman.profiler import FrameProfiler # noqa
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(HERE, "results.json")
+
+DIFFICULTIES = (1, 2, 3)  # Значения Menu.difficulty: easy, medium, hard
+INPUT_EVERY = 20  # Скрипт меняет направление раз в INPUT_EVERY тиков
+WINDOW = (720, 864)  # Окно в 1.5 раза больше кадра — путь smoothscale
+NOISE_FLOOR_US = 10.0  # Ухудшение времени фазы меньше этого (в мкс) — шум, а не регрессия
+REPEATS = 5  # Прогонов для медианы времени фаз и функций
+SWARM_GHOSTS = 1000  # Призраков в режиме роя (цель — 60 тиков и кадров в секунду на одном ядре)
+BATCH_GAMES = 1024  # Партий в пакете batch.BatchGames
+
+# Функции, стоимость которых меряется отдельно: (файл модуля, имя функции)
+FUNCTIONS = {
+    "Ghost.make_decision": ("engine.py", "make_decision"),
+    "Ghost.update": ("engine.py", "update"),
+    "Player.update": ("engine.py", "update"),
+    "draw_ghosts": ("render.py", "draw_ghosts"),
+    "draw_player": ("render.py", "draw_player"),
+}
+
+
+class Workload:
+    """Партии одной сложности с заскриптованным вводом; после конца партии начинается следующая"""
+    def __init__(self, difficulty, seed=1, ghosts=None, vectorized=False): # noqa
+        self.difficulty = difficulty
+        self.seed = seed
+        self.ghosts = ghosts
+        self.vectorized = vectorized
+        rng = random.Random(seed)
+        self.script = [rng.choice(DIRECTIONS) for _ in range(256)]
+        self.games = 0
+        self.state = None
+        self.new_game()
+
+    def new_game(self):
+        self.state = GameState(self.difficulty, seed=self.seed + self.games, ghost_count=self.ghosts,
+                               vectorized=self.vectorized)
+        self.games += 1
+
+    def step(self, timer=None):
+        state = self.state
+        if state.status != "playing":
+            self.new_game()
+            state = self.state
+        tick = state.tick
+        inputs = self.script[tick // INPUT_EVERY % len(self.script)] if tick % INPUT_EVERY == 0 else None
+        return step(state, inputs, timer)
+
+
+def bench_simulation(difficulty, ticks, repeat=3, ghosts=None, vectorized=False):
+    """Тики симуляции в секунду без отрисовки (лучший из repeat прогонов)"""
+    best = 0.0
+    for _ in range(repeat):
+        workload = Workload(difficulty, ghosts=ghosts, vectorized=vectorized)
+        started = time.perf_counter()
+        for _ in range(ticks):
+            workload.step()
+        best = max(best, ticks / (time.perf_counter() - started))
+    return best
+
+
+def bench_batch(difficulty, ticks, games=BATCH_GAMES):
+    """Тики партий в секунду у пакета из games партий (сумма по всем партиям)"""
+    import numpy as np
+    from pacman.batch import BatchGames, NO_INPUT
+    batch = BatchGames(games, difficulty, seed=1)
+    rng = np.random.default_rng(1)
+    started = time.perf_counter()
+    for tick in range(ticks):
+        batch.step(rng.integers(0, len(DIRECTIONS), games) if tick % INPUT_EVERY == 0 else np.full(games, NO_INPUT))
+    return games * ticks / (time.perf_counter() - started)
+
+
+def median_costs(runs):
+    """Поэлементная медиана словарей {имя: мкс} нескольких прогонов"""
+    merged = {}
+    for costs in runs:
+        for name, value in costs.items():
+            merged.setdefault(name, []).append(value)
+    return {name: sorted(values)[len(values) // 2] for name, values in merged.items()}
+
+
+def phase_costs(profiler):
+    """Среднее время фаз на кадр в микросекундах"""
+    frames = len(profiler.trace)
+    totals = {}
+    for _, _, phases in profiler.trace:
+        for name, seconds in phases.items():
+            totals[name] = totals.get(name, 0.0) + seconds
+    return {name: totals[name] / frames * 1e6 for name in profiler.phases}
+
+
+def bench_simulation_phases(difficulty, ticks, repeat=REPEATS):
+    return median_costs(simulation_phases(difficulty, ticks) for _ in range(repeat))
+
+
+def simulation_phases(difficulty, ticks):
+    profiler = FrameProfiler(trace_limit=ticks)
+    workload = Workload(difficulty)
+    for _ in range(ticks):
+        profiler.start_frame()
+        workload.step(profiler.mark)
+        profiler.end_frame()
+    return phase_costs(profiler)
+
+
+def bench_render(difficulty, frames, font, ghosts=None):
+    """Кадры в секунду (по медиане кадра) для отрисовщика и вывода на экран; симуляция в замер не входит"""
+    screen = pygame.display.set_mode(WINDOW)
+    surface = pygame.Surface((LOGICAL_WIDTH, LOGICAL_HEIGHT))
+    presenter = Presenter()
+    presenter.configure(screen, surface)
+    renderer = DirtyRenderer()
+    profiler = FrameProfiler(trace_limit=frames)
+    workload = Workload(difficulty, ghosts=ghosts)
+
+    for _ in range(frames):
+        workload.step()
+        profiler.start_frame()
+        rects = renderer.draw(surface, workload.state, 0, font, None, profiler.mark)
+        presenter.present(surface, rects, profiler.mark)
+        profiler.end_frame()
+
+    totals = sorted(total for _, total, _ in profiler.trace)
+    return 1 / totals[len(totals) // 2], phase_costs(profiler)
+
+
+def bench_functions(difficulty, ticks, font):
+    """Время на вызов (с вложенными вызовами) для FUNCTIONS, в микросекундах под cProfile"""
+    surface = pygame.Surface((LOGICAL_WIDTH, LOGICAL_HEIGHT))
+    renderer = DirtyRenderer()
+    workload = Workload(difficulty)
+
+    profile = cProfile.Profile()
+    profile.enable()
+    for _ in range(ticks):
+        workload.step()
+        renderer.draw(surface, workload.state, 0, font)
+    profile.disable()
+
+    # Player.update и Ghost.update — одноимённые функции одного файла, различаем по строке
+    from pacman.engine import Player, Ghost
+    lines = {"Player.update": Player.update.__code__.co_firstlineno,
+             "Ghost.update": Ghost.update.__code__.co_firstlineno}
+
+    result = {}
+    stats = pstats.Stats(profile).stats
+    for label, (filename, name) in FUNCTIONS.items():
+        for (path, line, func), (_, calls, _, cumulative, _) in stats.items():
+            if func == name and path.endswith(filename) and lines.get(label, line) == line and calls:
+                result[label] = cumulative / calls * 1e6
+                break
+    return result
+
+
+def bench_memory(difficulty, ticks, font):
+    """Пик выделенной Python-памяти за прогон симуляции с отрисовкой, в КиБ"""
+    surface = pygame.Surface((LOGICAL_WIDTH, LOGICAL_HEIGHT))
+    renderer = DirtyRenderer()
+    tracemalloc.start()
+    workload = Workload(difficulty)
+    for _ in range(ticks):
+        workload.step()
+        renderer.draw(surface, workload.state, 0, font)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+
+def run(ticks, frames, profile_ticks):
+    pygame.init()
+    pygame.display.set_mode(WINDOW)
+    font = pygame.font.SysFont("Arial", 24)
+    sprites.prebuild([RED, PINK, CYAN, ORANGE, BLUE])
+
+    results = {}
+    for difficulty in DIFFICULTIES:
+        render_fps, render_phases = bench_render(difficulty, frames, font)
+        render_phases = median_costs([render_phases] + [bench_render(difficulty, frames, font)[1]
+                                                        for _ in range(REPEATS - 1)])
+        results[f"difficulty_{difficulty}"] = {
+            "sim_ticks_per_s": bench_simulation(difficulty, ticks),
+            "render_frames_per_s": render_fps,
+            "sim_phases_us": bench_simulation_phases(difficulty, ticks),
+            "render_phases_us": render_phases,
+            "functions_us": median_costs(bench_functions(difficulty, profile_ticks, font) for _ in range(REPEATS)),
+            "peak_memory_kib": bench_memory(difficulty, profile_ticks, font),
+        }
+        print(f"difficulty {difficulty}: {results[f'difficulty_{difficulty}']['sim_ticks_per_s']:.0f} ticks/s, "
+              f"{render_fps:.0f} frames/s")
+
+    swarm_fps, swarm_phases = bench_render(2, frames // 4, font, SWARM_GHOSTS)
+    results[f"swarm_{SWARM_GHOSTS}"] = {
+        "sim_ticks_per_s": bench_simulation(2, ticks // 20, ghosts=SWARM_GHOSTS),
+        "render_frames_per_s": swarm_fps,
+        "render_phases_us": swarm_phases,
+    }
+    print(f"swarm {SWARM_GHOSTS}: {results[f'swarm_{SWARM_GHOSTS}']['sim_ticks_per_s']:.0f} ticks/s, "
+          f"{swarm_fps:.0f} frames/s")
+    try:
+        import numpy # noqa
+    except ImportError:
+        print("NumPy не установлен, векторный движок не меряется")
+    else:
+        numpy_rate = bench_simulation(2, ticks // 5, ghosts=SWARM_GHOSTS, vectorized=True)
+        results[f"swarm_{SWARM_GHOSTS}"]["sim_numpy_ticks_per_s"] = numpy_rate
+        print(f"swarm {SWARM_GHOSTS} (numpy): {numpy_rate:.0f} ticks/s")
+        results[f"batch_{BATCH_GAMES}"] = {"sim_ticks_per_s": bench_batch(2, ticks // 20)}
+        print(f"batch {BATCH_GAMES}: {results[f'batch_{BATCH_GAMES}']['sim_ticks_per_s']:.0f} game ticks/s")
+    pygame.quit()
+
+    return {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "machine": {"python": platform.python_version(), "pygame": pygame.version.ver,
+                    "platform": platform.platform(), "processor": platform.processor()},
+        "parameters": {"ticks": ticks, "frames": frames, "profile_ticks": profile_ticks},
+        "results": results,
+    }
+
+
+def flatten(results, prefix=""):
+    """{"difficulty_1.sim_ticks_per_s": значение, ...}"""
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        else:
+            flat[prefix + key] = value
+    return flat
+
+
+def higher_is_better(metric):
+    return metric.endswith("_per_s")
+
+
+def compare(current, baseline, threshold, phase_threshold=0.5):
+    """Список (метрика, эталон, сейчас, изменение) для метрик, ухудшившихся больше чем на threshold
+    (метрики времени *_us — больше чем на phase_threshold и на NOISE_FLOOR_US микросекунд)"""
+    current, baseline = flatten(current["results"]), flatten(baseline["results"])
+    regressions = []
+    for metric, before in baseline.items():
+        after = current.get(metric)
+        if after is None or before <= 0:
+            continue
+        change = (after - before) / before
+        worse = -change if higher_is_better(metric) else change
+        limit = threshold
+        if metric.endswith("_us") or "_us." in metric:
+            if after - before <= NOISE_FLOOR_US:
+                continue
+            limit = phase_threshold
+        if worse > limit:
+            regressions.append((metric, before, after, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки Pac-Man без окна")
+    parser.add_argument("--ticks", type=int, default=20000, help="тиков симуляции на сложность")
+    parser.add_argument("--frames", type=int, default=1200, help="кадров отрисовки на сложность")
+    parser.add_argument("--profile-ticks", type=int, default=3000,
+                        help="тиков под cProfile и tracemalloc на сложность")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="куда записать результаты (JSON)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="эталон для сравнения (JSON)")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="допустимое относительное ухудшение метрики (0.25 = 25 %%)")
+    parser.add_argument("--phase-threshold", type=float, default=0.5,
+                        help="допустимое ухудшение времени фаз и функций (медианы, мкс)")
+    parser.add_argument("--save-baseline", action="store_true", help="записать результаты как эталон")
+    args = parser.parse_args(argv)
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        # Без эталона проверка перед сборкой ничего не ловит — это ошибка, а не пропуск
+        parser.error(f"нет эталона {args.baseline}: снимите его с --save-baseline на машине сборки")
+
+    report = run(args.ticks, args.frames, args.profile_ticks)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Результаты: {args.output}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Эталон обновлён: {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+
+    regressions = compare(report, baseline, args.threshold, args.phase_threshold)
+    for metric, before, after, change in regressions:
+        print(f"РЕГРЕССИЯ {metric}: {before:.2f} -> {after:.2f} ({change:+.0%})")
+    if regressions:
+        return 1
+    print(f"Регрессий нет (порог {args.threshold:.0%}, для фаз {args.phase_threshold:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,6 +6,7 @@ datas = [
     ('assets/sounds/win.mp3', 'assets/sounds'),
     ('assets/sounds/pac-man-ghost-eat.mp3', 'assets/sounds'),
     ('assets/sounds/Power Up.mp3', 'assets/sounds'),
+    ('assets/maps/classic.txt', 'assets/maps'),
 ]
 
 a = Analysis(
@@ -0,0 +1 @@
+"""Pac-Man (SUAI edition): игровая логика, отделённая от окна, звука и шрифтов"""
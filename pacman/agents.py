@@ -0,0 +1,357 @@
+"""Боты за Пакмана для прогонов без окна (tournament.py, бенчмарки).
+
+Бот — вызываемый объект agent(state) -> направление (dx, dy) или None (ввода нет),
+который вызывается перед каждым step(state, ...). Боты создаются фабрикой
+factory(seed, level); фабрики встроенных ботов — в AGENTS, сторонние задаются
+строкой "модуль:имя" (см. load_agent). Встроенному боту можно передать параметры:
+"search:iterations=200" — перебор по числу итераций, а не по часам, так что
+турнирные прогоны повторяются на любой машине и под любой нагрузкой.
+"""
+import importlib
+import inspect
+import math
+import random
+import time
+from collections import deque
+from functools import partial
+
+from .settings import TILE_SIZE
+from .maze import DIRECTIONS, MASK_CODES, OPPOSITE, DX, DY
+from .engine import step
+
+DANGEROUS = ("scatter", "chase", "respawning")  # Призраки в этих состояниях убивают при касании
+
+
+class RandomAgent:
+    """Раз в period тиков выбирает случайное направление"""
+    def __init__(self, seed=0, level=None, period=20): # noqa
+        self.rng = random.Random(seed)
+        self.period = period
+
+    def __call__(self, state):
+        if state.tick % self.period == 0:
+            return self.rng.choice(DIRECTIONS)
+        return None
+
+
+class GreedyAgent:
+    """Идёт к ближайшей монете обходом в ширину, минуя клетки опасных призраков и соседние с ними.
+
+    Путь пересчитывается, только когда Пакман переходит в новую клетку.
+    """
+    def __init__(self, seed=0, level=None): # noqa
+        self.rng = random.Random(seed)
+        self.last_cell = -1
+
+    def __call__(self, state):
+        player, level = state.player, state.level
+        cols = level.cols
+        cell = player.grid_y * cols + player.grid_x
+        if cell == self.last_cell:
+            return None
+        self.last_cell = cell
+
+        blocked = set()
+        if player.immune_timer <= 0:
+            for ghost in state.ghosts:
+                if ghost.state in DANGEROUS:
+                    ghost_cell = ghost.grid_y * cols + ghost.grid_x
+                    blocked.add(ghost_cell)
+                    blocked.update(neighbour for _, neighbour in self.neighbours(level, ghost_cell))
+
+        code = self.first_step(state, cell, blocked)
+        if code is None:
+            codes = MASK_CODES[level.moves[cell]] if 0 <= cell < len(level.moves) else ()
+            return DIRECTIONS[self.rng.choice(codes)] if codes else None
+        return DIRECTIONS[code]
+
+    @staticmethod
+    def neighbours(level, cell):
+        """(код направления, клетка) для ходов из клетки cell"""
+        cols = level.cols
+        y, x = divmod(cell, cols)
+        for code in MASK_CODES[level.moves[cell]]:
+            dx, dy = DIRECTIONS[code]
+            yield code, (y + dy) * cols + x + dx
+
+    def first_step(self, state, start, blocked):
+        """Код первого шага к ближайшей клетке с монетой или бонусом; None, если пути нет"""
+        level, cells = state.level, state.pellets.cells
+        if not 0 <= start < len(cells):
+            return None
+        first = {start: None}
+        queue = deque([start])
+        while queue:
+            cell = queue.popleft()
+            if cells[cell] and cell != start:
+                return first[cell]
+            for code, neighbour in self.neighbours(level, cell):
+                if neighbour not in first and neighbour not in blocked:
+                    first[neighbour] = code if cell == start else first[cell]
+                    queue.append(neighbour)
+        return None
+
+
+# --- ПЕРЕБОР (MCTS) ---
+MACRO_TICKS = TILE_SIZE * 5 // 6  # Ход дерева длится до входа в новую клетку, но не дольше (≈1.25 клетки)
+SEARCH_DEPTH = 6  # Ходов (клеток) от корня до конца оценки
+DEATH_PENALTY = 10.0  # Оценка: 100 очков = 1, потеря жизни — минус DEATH_PENALTY
+WIN_BONUS = 20.0
+EXPLORATION = 1.4  # Константа UCB1
+TAIL_RESERVE = 5e-5  # Секунд бюджета на выход из поиска и ответ после последнего тика перебора
+
+
+class Node:
+    """Узел дерева перебора: ход, которым в него пришли, посещения и сумма оценок"""
+    __slots__ = ("code", "children", "untried", "visits", "total", "state")
+
+    def __init__(self, code=None): # noqa
+        self.code = code
+        self.children = []
+        self.untried = None  # Ещё не испробованные коды (заполняются при первом заходе)
+        self.visits = 0
+        self.total = 0.0
+        self.state = None  # Слепок партии после хода (хранится у детей корня — это следующий корень)
+
+    def best(self):
+        """Самый посещаемый ребёнок (надёжнее, чем самая высокая средняя оценка)"""
+        return max(self.children, key=lambda child: child.visits, default=None)
+
+
+class SearchAgent:
+    """Автопилот: Монте-Карло поиск по дереву (MCTS с UCB1) поверх настоящего движка.
+
+    Ход дерева — направление, выбранное при входе Пакмана в клетку; партия моделируется
+    копией состояния (GameState.clone/restore), так что призраки в переборе ходят
+    по тем же правилам (Ghost.make_decision, get_chase_target), что и в игре. Генератор
+    партии копии не достаётся: после каждого отката копия получает свежее зерно от
+    генератора бота (reseed), и случайные ходы призраков перебор угадывает, а не знает.
+    Пока Пакман идёт к следующей клетке, его путь уже известен, поэтому дерево растёт
+    заранее от предсказанного состояния на входе в неё: каждый тик поиск занимает
+    не больше budget секунд (или iterations итераций — для повторяемых прогонов),
+    а на входе в клетку выбирается лучший ход. Если времени не хватило ни на одну
+    оценку или модель разошлась с игрой, ход выбирает GreedyAgent.
+    """
+    def __init__(self, seed=0, level=None, budget=0.004, iterations=None): # noqa
+        self.rng = random.Random(seed)
+        self.budget = budget
+        self.iterations = iterations
+        self.fallback = GreedyAgent(seed, level)
+        self.game = None  # Партия, которую ведёт бот
+        self.scratch = None  # Её копия, на которой проигрываются варианты
+        self.root = None  # Узел дерева для следующего решения
+        self.root_state = None  # Слепок партии в момент следующего решения
+        self.decision_tick = -1
+        self.expected = None  # Где по модели будет Пакман в момент решения
+        self.fallbacks = 0  # Решений, принятых запасным ботом
+        self.overruns = 0  # Тиков, на которые бот потратил больше бюджета
+        self.step_cost = min(1e-4, budget / 4)  # Затухающий максимум времени тика: запас до срока
+
+    def __call__(self, state):
+        started = time.perf_counter()
+        try:
+            return self.decide(state, started)
+        finally:
+            if time.perf_counter() - started > self.budget:
+                self.overruns += 1
+
+    def decide(self, state, started):
+        """Ход на этот тик (тело __call__; время вызова меряет __call__)"""
+        if state is not self.game or state.tick > self.decision_tick:
+            self.plan(state)  # Новая партия или решение пропущено — корень в текущем состоянии
+        if state.tick < self.decision_tick:
+            self.search(started + self.budget - TAIL_RESERVE)  # Идём к клетке решения — растим дерево
+            return None
+        if (state.player.pix_x, state.player.pix_y) != self.expected:
+            self.plan(state)  # Модель разошлась с игрой
+        if not self.root.children:
+            self.search(started + self.budget / 2)  # Дерево не успело вырасти; половина — на advance
+
+        best = self.root.best()
+        if best is None:
+            self.fallbacks += 1
+            direction = self.fallback(state)
+            code = DIRECTIONS.index(direction) if direction is not None else None
+        else:
+            code = best.code
+        self.advance(state, code, best)
+        return DIRECTIONS[code] if code is not None else None
+
+    def plan(self, state):
+        """Ставит корень дерева в текущее состояние"""
+        if state is not self.game:
+            self.game = state
+            self.scratch = state.clone()
+        self.root = Node()
+        self.root_state = state.snapshot()
+        self.decision_tick = state.tick
+        self.expected = (state.player.pix_x, state.player.pix_y)
+
+    def advance(self, state, code, child=None):
+        """После решения code: новый корень — предсказанное состояние на входе в следующую клетку.
+
+        Слепок ребёнка child годится, только если игра пришла ровно в корень дерева
+        (призраки не свернули иначе, чем в модели); иначе ход проигрывается от настоящей партии.
+        """
+        scratch = self.scratch
+        current = state.snapshot()
+        root = self.root_state
+        if child is not None and child.state is not None and current.swarm is None and \
+                current.ghosts == root.ghosts and current.player == root.player:
+            scratch.restore(child.state)
+            self.root_state = child.state
+        else:
+            scratch.restore(current)
+            self.reseed()
+            self.macro(scratch, code)
+            self.root_state = scratch.snapshot()
+        self.root = Node()
+        self.decision_tick = scratch.tick
+        self.expected = (scratch.player.pix_x, scratch.player.pix_y)
+        self.fallback.last_cell = -1
+
+    def reseed(self):
+        """Случайность копии — своя, от генератора бота, а не продолжение генератора партии"""
+        scratch = self.scratch
+        seed = self.rng.getrandbits(64)
+        scratch.rng.seed(seed)  # Призраки копии ходят по её генератору
+        if scratch.swarm is not None:
+            import numpy as np
+            scratch.swarm.rng = np.random.default_rng(seed)
+
+    def macro(self, state, code, deadline=None):
+        """Ход дерева: направление code, затем без ввода до входа в новую клетку.
+
+        Возвращает False, если следующий тик не успеть до deadline (итерация тогда не засчитывается).
+        """
+        player = state.player
+        cell = (player.grid_x, player.grid_y)
+        direction = DIRECTIONS[code] if code is not None else None
+        for _ in range(MACRO_TICKS):
+            if deadline is None:
+                step(state, direction)
+            else:
+                now = time.perf_counter()
+                if now + self.step_cost > deadline:
+                    return False
+                step(state, direction)
+                # Выброс (сборка мусора, планировщик) не должен съесть весь бюджет следующих тиков
+                self.step_cost = min(max(self.step_cost * 0.99, time.perf_counter() - now), self.budget / 4)
+            direction = None
+            if state.status != "playing" or (player.grid_x, player.grid_y) != cell:
+                break
+        return True
+
+    def legal_codes(self, state):
+        """Направления из клетки Пакмана; разворот — только если других нет"""
+        player, level = state.player, state.level
+        if not player.is_alive:
+            return [None]
+        cell = player.grid_y * level.cols + player.grid_x
+        codes = list(MASK_CODES[level.moves[cell]]) if 0 <= cell < len(level.moves) else []
+        return codes or [None]
+
+    def rollout_code(self, state, code):
+        """Ход доигрывания после хода code"""
+        codes = self.legal_codes(state)
+        if codes[0] is None:
+            return None
+        forward = [c for c in codes if code is None or c != OPPOSITE[code]] or codes
+        player, cells, cols = state.player, state.pellets.cells, state.level.cols
+        cell = player.grid_y * cols + player.grid_x
+        tasty = [c for c in forward if cells[cell + DX[c] + DY[c] * cols]]
+        return self.rng.choice(tasty or forward)
+
+    def search(self, deadline):
+        """Итерации MCTS от корня до deadline (или iterations итераций)"""
+        if self.iterations is not None:
+            for _ in range(self.iterations):
+                self.iterate(None)
+            return
+        while self.iterate(deadline):
+            pass
+
+    def iterate(self, deadline):
+        """Одна итерация: спуск по UCB1, раскрытие, случайное доигрывание, обратный проход"""
+        if deadline is not None and time.perf_counter() + self.step_cost > deadline:
+            return False  # Не успеть даже откат и один тик
+        scratch = self.scratch
+        scratch.restore(self.root_state)
+        self.reseed()
+        lives, score = scratch.lives, scratch.score
+        node, path = self.root, [self.root]
+        for _ in range(SEARCH_DEPTH):
+            if scratch.status != "playing":
+                break
+            if node.untried is None:
+                node.untried = self.legal_codes(scratch)
+                self.rng.shuffle(node.untried)
+            if node.untried:
+                child = Node(node.untried.pop())
+                node.children.append(child)
+            else:
+                # Ребёнок без посещений остаётся от итерации, прерванной по бюджету, — его первым
+                log_visits = math.log(max(node.visits, 1))
+                child = max(node.children, key=lambda c: c.total / c.visits +
+                            EXPLORATION * math.sqrt(log_visits / c.visits) if c.visits else math.inf)
+            if not self.macro(scratch, child.code, deadline):
+                return False
+            if node is self.root and child.state is None:
+                child.state = scratch.snapshot()
+            node = child
+            path.append(node)
+            if node.visits == 0:
+                break
+
+        # Доигрывание до глубины SEARCH_DEPTH: без разворотов, по возможности в клетку с монетой
+        code = node.code
+        for _ in range(SEARCH_DEPTH - len(path) + 1):
+            if scratch.status != "playing":
+                break
+            code = self.rollout_code(scratch, code)
+            if not self.macro(scratch, code, deadline):
+                return False
+
+        value = (scratch.score - score) / 100 - DEATH_PENALTY * (lives - scratch.lives)
+        if scratch.status == "win":
+            value += WIN_BONUS
+        for visited in path:
+            visited.visits += 1
+            visited.total += value
+        return True
+
+
+AGENTS = {
+    "random": RandomAgent,
+    "greedy": GreedyAgent,
+    "search": SearchAgent,
+}
+
+
+def load_agent(spec):
+    """Фабрика бота по имени из AGENTS (с параметрами: "имя:ключ=значение,...") или по строке "модуль:имя" """
+    module, _, name = spec.partition(":")
+    if module in AGENTS:
+        factory = AGENTS[module]
+        return partial(factory, **parse_options(factory, name)) if name else factory
+    if not name:
+        raise ValueError(f"неизвестный бот {spec!r}: ожидалось одно из {', '.join(AGENTS)} или модуль:имя")
+    return getattr(importlib.import_module(module), name)
+
+
+def parse_options(factory, text):
+    """"ключ=значение,..." -> словарь параметров фабрики (числа — int или float)"""
+    known = [name for name in inspect.signature(factory).parameters if name not in ("seed", "level")]
+    options = {}
+    for item in text.split(","):
+        key, sep, value = item.partition("=")
+        if not sep or key not in known:
+            raise ValueError(f"неверный параметр бота {item!r}: ожидалось ключ=значение, ключи: {', '.join(known)}")
+        try:
+            options[key] = int(value)
+        except ValueError:
+            try:
+                options[key] = float(value)
+            except ValueError:
+                raise ValueError(f"параметр бота {key}: значение должно быть числом, получено {value!r}")
+    return options
@@ -0,0 +1,263 @@
+"""Пакет из N независимых партий, которые идут в ногу (для обучения ботов и балансировки).
+
+Состояние всех партий хранится в массивах NumPy: клетки и пиксели игроков, коды
+направлений, таймеры, жизни, счёт, монеты (по строке на партию), а призраки всех
+партий лежат в одном swarm.GhostArrays. Один вызов step(actions) продвигает все
+партии на тик по правилам engine.step: монета +10, бонус +50, энерджайзер +100
+и испуг призраков на 5 секунд, съеденный призрак +200. Закончившаяся партия
+(победа или конец жизней) сразу начинается заново, итоговый счёт остаётся
+в final_score.
+
+    from pacman.batch import BatchGames
+    games = BatchGames(1024, difficulty=2, seed=1)
+    rewards, done = games.step(actions)  # actions — коды DIRECTIONS, -1 — без ввода
+
+Случайность — из генератора NumPy, поэтому партии пакета не совпадают с партиями
+GameState того же зерна (как и у векторного движка призраков). Нужен NumPy.
+"""
+import numpy as np
+
+from .settings import TILE_SIZE, RED, PINK, CYAN, ORANGE
+from .maze import STOP_CODE, NO_DIRECTION
+from .level import LEVEL
+from .engine import PelletGrid, COIN, ENERGIZER, GHOST_SPEEDS
+from .swarm import GhostArrays, DX, DY, FRIGHTENED, EATEN
+
+PLAYING, GAME_OVER, WIN = range(3)
+STATUS_NAMES = ("playing", "game_over", "win")
+NO_INPUT = -1
+
+PLAYER_SPEED = 1.5
+START_IMMUNITY = 120
+RESPAWN_IMMUNITY = 180
+DEATH_FRAMES = 60  # Кадры анимации смерти (Player.death_animation_frames)
+DEATH_SPEED = 2
+PLAYER_PORTAL_COOLDOWN = 10
+REWARDS = np.array([0, 10, 50, 100])  # Очки по виду клетки: EMPTY, COIN, BONUS, ENERGIZER
+GHOST_REWARD = 200
+
+
+class BatchGames:
+    """N партий одной карты и сложности; все поля — массивы длиной n (pellets — n x клеток).
+
+    ghost_count — призраков в каждой партии (по умолчанию — по стартовым позициям карты).
+    """
+    def __init__(self, n, difficulty=1, level=LEVEL, seed=None, ghost_count=None): # noqa
+        self.n = n
+        self.difficulty = difficulty
+        self.level = level
+        self.cols = level.cols
+        self.rng = np.random.default_rng(seed)
+        self.moves = np.frombuffer(level.moves, dtype=np.uint8).astype(np.int64)
+        self.portal_code = np.full(level.rows * level.cols, NO_DIRECTION, dtype=np.int64)
+        self.portal_exit = np.zeros(level.rows * level.cols, dtype=np.int64)
+        for cell, (code, exit_cell) in level.portal_exits.items():
+            self.portal_code[cell] = code
+            self.portal_exit[cell] = exit_cell
+
+        # Монеты: одна строка шаблона на карту, копия на каждую партию
+        self.pellet_template = np.frombuffer(bytes(PelletGrid(level.grid).cells), dtype=np.uint8)
+        self.coins_total = int(np.count_nonzero(self.pellet_template == COIN))
+        self.bonuses_total = int(np.count_nonzero(self.pellet_template > COIN))
+        self.pellets = np.tile(self.pellet_template, (n, 1))
+        self.coins_left = np.full(n, self.coins_total)
+        self.bonuses_left = np.full(n, self.bonuses_total)
+
+        self.grid_x = np.empty(n, dtype=np.int64)
+        self.grid_y = np.empty(n, dtype=np.int64)
+        self.pix_x = np.empty(n)
+        self.pix_y = np.empty(n)
+        self.code = np.empty(n, dtype=np.int64)
+        self.next_code = np.empty(n, dtype=np.int64)
+        self.alive = np.empty(n, dtype=bool)
+        self.death_frame = np.empty(n, dtype=np.int64)
+        self.immune_timer = np.empty(n, dtype=np.int64)
+        self.portal_cooldown = np.empty(n, dtype=np.int64)
+        self.lives = np.empty(n, dtype=np.int64)
+        self.score = np.empty(n, dtype=np.int64)
+        self.tick = np.empty(n, dtype=np.int64)
+        self.status = np.empty(n, dtype=np.int64)
+        self.final_score = np.full(n, -1)  # Счёт последней законченной партии (-1 — ещё не было)
+        self.games_played = np.zeros(n, dtype=np.int64)
+        self.restart_players(np.ones(n, dtype=bool))
+
+        # Призраки всех партий — в одних массивах, по ghosts_per_game подряд на партию
+        colors = [RED, PINK, CYAN, ORANGE]
+        spawns = level.ghost_spawns
+        self.ghosts_per_game = count = len(spawns) if ghost_count is None else ghost_count
+        speeds = np.full((n, count), GHOST_SPEEDS[difficulty - 1])
+        if count > len(spawns):
+            speeds[:, len(spawns):] *= self.rng.uniform(0.8, 1.0, (n, count - len(spawns)))
+        self.ghosts = GhostArrays(level, [spawns[i % len(spawns)] for i in range(count)] * n,
+                                  [colors[i % len(colors)] for i in range(count)] * n,
+                                  speeds.ravel(), self.rng.integers(1 << 63), np.repeat(np.arange(n), count))
+
+    def restart_players(self, games):
+        """Новая партия для отмеченных в маске games: игрок на старте, монеты на месте, 3 жизни"""
+        x, y = self.level.player_spawn
+        self.grid_x[games] = x
+        self.grid_y[games] = y
+        self.pix_x[games] = x * TILE_SIZE
+        self.pix_y[games] = y * TILE_SIZE
+        self.code[games] = STOP_CODE
+        self.next_code[games] = STOP_CODE
+        self.alive[games] = True
+        self.death_frame[games] = 0
+        self.immune_timer[games] = START_IMMUNITY
+        self.portal_cooldown[games] = 0
+        self.lives[games] = 3
+        self.score[games] = 0
+        self.tick[games] = 0
+        self.status[games] = PLAYING
+        self.pellets[games] = self.pellet_template
+        self.coins_left[games] = self.coins_total
+        self.bonuses_left[games] = self.bonuses_total
+
+    def reset(self, games=None):
+        """Начинает заново партии из маски games (по умолчанию все)"""
+        if games is None:
+            games = np.ones(self.n, dtype=bool)
+        self.restart_players(games)
+        self.ghosts.restart(games)
+
+    # --- ТИК ---
+    def step(self, actions=None):
+        """Продвигает все партии на тик.
+
+        actions — коды направлений (индексы DIRECTIONS, STOP_CODE — стоп) по партиям,
+        NO_INPUT (-1) — ввода нет; None — ни в одной партии ввода нет.
+        Возвращает (награды за тик, маска закончившихся партий); закончившиеся
+        партии уже начаты заново, их итоговый счёт — в final_score.
+        """
+        score = self.score.copy()
+        if actions is not None:
+            actions = np.asarray(actions)
+            pressed = actions != NO_INPUT
+            self.next_code[pressed] = actions[pressed]
+
+        self.tick += 1
+        self.update_players()
+        ghosts = self.ghosts
+        ghosts.step(self.grid_x, self.grid_y, self.code)
+        self.collide()
+        self.collect()
+
+        done = self.status != PLAYING
+        rewards = self.score - score
+        if done.any():
+            self.final_score[done] = self.score[done]
+            self.games_played[done] += 1
+            self.reset(done)
+        return rewards, done
+
+    def update_players(self):
+        """Player.update для всех партий"""
+        idx = np.flatnonzero(self.alive)  # Воскресшие на этом тике ещё стоят
+        dead = np.flatnonzero(~self.alive)
+        if len(dead):
+            self.death_frame[dead] += DEATH_SPEED
+            revived = dead[self.death_frame[dead] > DEATH_FRAMES]
+            # Как у Player: после смерти — на старт карты с иммунитетом
+            x, y = self.level.player_spawn
+            self.alive[revived] = True
+            self.death_frame[revived] = 0
+            self.immune_timer[revived] = RESPAWN_IMMUNITY
+            self.grid_x[revived] = x
+            self.grid_y[revived] = y
+            self.pix_x[revived] = x * TILE_SIZE
+            self.pix_y[revived] = y * TILE_SIZE
+            self.code[revived] = STOP_CODE
+
+        if not len(idx):
+            return
+        self.immune_timer[idx] -= self.immune_timer[idx] > 0
+        self.portal_cooldown[idx] -= self.portal_cooldown[idx] > 0
+
+        gx, gy = self.grid_x[idx], self.grid_y[idx]
+        mask = self.moves[gy * self.cols + gx]
+        at_center = ((np.abs(self.pix_x[idx] - gx * TILE_SIZE) < 2) &
+                     (np.abs(self.pix_y[idx] - gy * TILE_SIZE) < 2))
+        turn = at_center & (mask >> self.next_code[idx] & 1 == 1)
+        turning = idx[turn]
+        self.code[turning] = self.next_code[turning]
+        self.next_code[turning] = STOP_CODE
+
+        code = self.code[idx]
+        blocked = mask >> code & 1 == 0  # STOP_CODE тоже: в маске нет бита 4
+        stopped = idx[blocked]
+        self.code[stopped] = STOP_CODE
+        self.pix_x[stopped] = self.grid_x[stopped] * TILE_SIZE
+        self.pix_y[stopped] = self.grid_y[stopped] * TILE_SIZE
+        moving, code = idx[~blocked], code[~blocked]
+        self.pix_x[moving] += DX[code] * PLAYER_SPEED
+        self.pix_y[moving] += DY[code] * PLAYER_SPEED
+
+        self.grid_x[idx] = np.rint(self.pix_x[idx] / TILE_SIZE)
+        self.grid_y[idx] = np.rint(self.pix_y[idx] / TILE_SIZE)
+
+        # Телепортация на противоположный край карты
+        idx = idx[self.portal_cooldown[idx] == 0]
+        cells = self.grid_y[idx] * self.cols + self.grid_x[idx]
+        portal = self.portal_code[cells] != NO_DIRECTION
+        idx, cells = idx[portal], cells[portal]
+        if len(idx):
+            self.grid_y[idx], self.grid_x[idx] = np.divmod(self.portal_exit[cells], self.cols)
+            across = DX[self.portal_code[cells]] != 0  # Переносится только координата вдоль оси портала
+            self.pix_x[idx[across]] = self.grid_x[idx[across]] * TILE_SIZE
+            self.pix_y[idx[~across]] = self.grid_y[idx[~across]] * TILE_SIZE
+            self.portal_cooldown[idx] = PLAYER_PORTAL_COOLDOWN
+
+    def collide(self):
+        """Столкновения игроков с призраками своих партий (как в engine.step).
+
+        Призраки партии проверяются по порядку: испуганные до первого смертельного
+        столкновения съедаются, после смерти игрока остальные не проверяются.
+        """
+        ghosts = self.ghosts
+        size = TILE_SIZE - 8
+        hit = ghosts.touching_mask((self.pix_x + 4).astype(np.int64), (self.pix_y + 4).astype(np.int64), size)
+        hit &= self.alive[ghosts.game]
+        if not hit.any():
+            return
+        number = np.flatnonzero(hit)
+        game, state = ghosts.game[number], ghosts.state[number]
+        killer = (state != FRIGHTENED) & (state != EATEN) & (self.immune_timer[game] <= 0)
+        first = np.full(self.n, ghosts.n)
+        np.minimum.at(first, game[killer], number[killer])
+
+        eaten = number[(state == FRIGHTENED) & (number < first[game])]
+        if len(eaten):
+            ghosts.eat(eaten)
+            self.score += GHOST_REWARD * np.bincount(ghosts.game[eaten], minlength=self.n)
+
+        died = first < ghosts.n
+        if died.any():
+            self.lives[died] -= 1
+            self.alive[died] = False
+            self.status[died & (self.lives <= 0)] = GAME_OVER
+
+    def collect(self):
+        """Сбор монет и бонусов в клетках игроков и проверка победы"""
+        rows = np.arange(self.n)
+        inside = (0 <= self.grid_x) & (self.grid_x < self.cols) & (0 <= self.grid_y) & (self.grid_y < self.level.rows)
+        rows = rows[inside]
+        cells = self.grid_y[rows] * self.cols + self.grid_x[rows]
+        kind = self.pellets[rows, cells]
+        taken = kind != 0
+        rows, cells, kind = rows[taken], cells[taken], kind[taken]
+        if not len(rows):
+            return
+        self.pellets[rows, cells] = 0
+        self.score[rows] += REWARDS[kind]
+        coin = kind == COIN
+        self.coins_left[rows[coin]] -= 1
+        self.bonuses_left[rows[~coin]] -= 1
+
+        powered = np.zeros(self.n, dtype=bool)
+        powered[rows[kind == ENERGIZER]] = True
+        if powered.any():
+            self.ghosts.frighten(5, powered)
+
+        won = rows[(self.coins_left[rows] + self.bonuses_left[rows]) == 0]
+        self.status[won] = WIN
+
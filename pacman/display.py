@@ -0,0 +1,169 @@
+"""Вывод логической поверхности игры в окно с сохранением пропорций"""
+import bisect
+import functools
+
+import pygame
+
+ALIGN_EPSILON = 1 / 64  # Допустимый сдвиг фазы фильтра при масштабировании куска, в пикселях
+
+
+@functools.lru_cache(maxsize=16)
+def aligned_points(src_size, dst_size):
+    """Координаты экрана, в которые smoothscale отображает почти целый пиксель исходника.
+
+    Кусок, начинающийся и заканчивающийся в таких точках, масштабируется
+    с той же фазой фильтра, что и целый кадр, поэтому швов на границах нет.
+    Возвращает пары (координата на экране, координата в исходнике).
+    """
+    if dst_size > src_size:
+        # Растяжение: пиксель x экрана берётся из x * (src - 1) / dst
+        numerator, end = src_size - 1, src_size - 1
+    else:
+        # Сжатие: пиксель x экрана покрывает исходник от x * src / dst
+        numerator, end = src_size, src_size
+    points = []
+    for x in range(dst_size):
+        src, rest = divmod(x * numerator, dst_size)
+        if rest <= dst_size * ALIGN_EPSILON:
+            points.append((x, src))
+        elif dst_size - rest <= dst_size * ALIGN_EPSILON:
+            points.append((x, src + 1))
+    points.append((dst_size, end))
+    return points
+
+
+def axis_window(lo, hi, src_size, dst_size):
+    """Выровненный отрезок исходника и экрана, покрывающий [lo, hi) на экране"""
+    if src_size == dst_size:
+        return lo, hi - lo, lo, hi - lo
+    points = aligned_points(src_size, dst_size)
+    keys = [x for x, _ in points]
+    x0, a = points[max(bisect.bisect_right(keys, lo) - 1, 0)]
+    x1, b = points[min(bisect.bisect_left(keys, hi), len(points) - 1)]
+    # При растяжении последний пиксель экрана опирается на пиксель исходника b
+    src_width = b - a + 1 if dst_size > src_size else b - a
+    return a, src_width, x0, x1 - x0
+
+
+class Presenter:
+    """Вывод кадра в окно: раскладка считается только при смене окна.
+
+    Режимы: "copy" — кадр выводится без масштабирования, "integer" — целое
+    увеличение без сглаживания (pixel perfect), "smooth" — smoothscale
+    в заранее выделенную поверхность.
+    """
+    def __init__(self, pixel_perfect=False): # noqa
+        self.pixel_perfect = pixel_perfect
+        self.screen = None
+        self.mode = None
+        self.factor = 1
+        self.size = (0, 0)
+        self.dest_rect = pygame.Rect(0, 0, 0, 0)
+        self.scaled = None
+        self.flip_next = True
+
+    def configure(self, screen, surface):
+        """Пересчитывает раскладку; вызывается после VIDEORESIZE, F11 и смены режима"""
+        window_width, window_height = screen.get_size()
+        game_width, game_height = surface.get_size()
+        scale = min(window_width / game_width, window_height / game_height)  # сохранение пропорций
+
+        if self.pixel_perfect and scale >= 1:
+            self.factor = int(scale)
+            self.mode = "copy" if self.factor == 1 else "integer"
+            new_width, new_height = game_width * self.factor, game_height * self.factor
+        else:
+            new_width, new_height = int(game_width * scale), int(game_height * scale)
+            self.mode = "copy" if (new_width, new_height) == (game_width, game_height) else "smooth"
+
+        pos_x = (window_width - new_width) // 2
+        pos_y = (window_height - new_height) // 2
+        self.screen = screen
+        self.size = (new_width, new_height)
+        self.dest_rect = pygame.Rect(pos_x, pos_y, new_width, new_height)
+        # Поверхность под масштабированный кадр выделяется один раз на раскладку
+        self.scaled = pygame.Surface(self.size, 0, surface) if self.mode != "copy" else None
+
+        screen.fill((0, 0, 0))  # черный фон вокруг
+        self.flip_next = True
+
+    def refresh(self):
+        """Следующий кадр выводится целиком (окно перекрывали или оно потеряло содержимое)"""
+        self.flip_next = True
+
+    def toggle_pixel_perfect(self, surface):
+        self.pixel_perfect = not self.pixel_perfect
+        self.configure(self.screen, surface)
+
+    def present(self, surface, rects=None, timer=None):
+        """Показывает кадр целиком или только области rects (в координатах кадра).
+
+        timer — необязательная отметка конца фазы (FrameProfiler.mark).
+        """
+        if rects is None or self.flip_next:
+            self._present_full(surface, timer)
+        else:
+            self._present_rects(surface, rects, timer)
+
+    def _present_full(self, surface, timer=None):
+        if self.mode == "copy":
+            self.screen.blit(surface, self.dest_rect)
+        else:
+            if self.mode == "integer":
+                pygame.transform.scale(surface, self.size, self.scaled)
+            else:
+                pygame.transform.smoothscale(surface, self.size, self.scaled)
+            self.screen.blit(self.scaled, self.dest_rect)
+        if timer: timer("scale")
+
+        if self.flip_next:
+            self.flip_next = False
+            pygame.display.flip()
+        else:
+            pygame.display.update(self.dest_rect)
+        if timer: timer("flip")
+
+    def _present_rects(self, surface, rects, timer=None):
+        """Масштабирует только изменившиеся области кадра и обновляет их на экране"""
+        game_width, game_height = surface.get_size()
+        new_width, new_height = self.size
+        pos_x, pos_y = self.dest_rect.topleft
+        bounds = surface.get_rect()
+        updated = []
+
+        for rect in rects:
+            rect = rect.clip(bounds)
+            if not rect:
+                continue
+
+            if self.mode == "copy":
+                self.screen.blit(surface, (pos_x + rect.x, pos_y + rect.y), rect)
+                updated.append(rect.move(pos_x, pos_y))
+                continue
+
+            if self.mode == "integer":
+                # Целое увеличение: кусок ложится ровно в rect * factor
+                k = self.factor
+                piece = pygame.transform.scale(surface.subsurface(rect), (rect.w * k, rect.h * k))
+                target = pygame.Rect(pos_x + rect.x * k, pos_y + rect.y * k, rect.w * k, rect.h * k)
+                self.screen.blit(piece, target)
+                updated.append(target)
+                continue
+
+            # Запас в пиксель экрана с каждой стороны под сглаживание
+            lo_x = max(rect.left * new_width // game_width - 1, 0)
+            hi_x = min(-(-rect.right * new_width // game_width) + 1, new_width)
+            lo_y = max(rect.top * new_height // game_height - 1, 0)
+            hi_y = min(-(-rect.bottom * new_height // game_height) + 1, new_height)
+            src_x, src_w, x0, dst_w = axis_window(lo_x, hi_x, game_width, new_width)
+            src_y, src_h, y0, dst_h = axis_window(lo_y, hi_y, game_height, new_height)
+
+            piece = surface.subsurface((src_x, src_y, src_w, src_h))
+            if (dst_w, dst_h) != (src_w, src_h):
+                piece = pygame.transform.smoothscale(piece, (dst_w, dst_h))
+            self.screen.blit(piece, (pos_x + x0, pos_y + y0))
+            updated.append(pygame.Rect(pos_x + x0, pos_y + y0, dst_w, dst_h))
+        if timer: timer("scale")
+
+        pygame.display.update(updated)
+        if timer: timer("flip")
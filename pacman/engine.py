@@ -0,0 +1,776 @@
+"""Безоконное ядро симуляции: состояние партии и шаг игры.
+
+Модуль не импортирует pygame и не трогает дисплей, микшер или шрифты,
+поэтому партию можно прогонять тысячи раз быстрее реального времени
+(боты, тесты, балансировка). Все таймеры считают тики симуляции (FPS в секунду).
+"""
+import random
+
+from .settings import TILE_SIZE, ROWS, COLS, FPS, BLUE, WHITE, RED, CYAN, PINK, ORANGE
+from .maze import (STOP, LEFT, RIGHT, UP, DOWN, DIRECTIONS, NO_DIRECTION, UNREACHABLE, STOP_CODE, VECTORS, # noqa
+                   CODES, DX, DY, OPPOSITE, MASK_CODES)
+from .level import LEVEL
+
+
+def rects_collide(ax, ay, aw, ah, bx, by, bw, bh):
+    """Пересечение прямоугольников по правилам pygame.Rect.colliderect"""
+    ax, ay, bx, by = int(ax), int(ay), int(bx), int(by)
+    return ax < bx + bw and bx < ax + aw and ay < by + bh and by < ay + ah
+
+
+class SpatialHash:
+    """Равномерная сетка корзин по клеткам карты для широкой фазы столкновений.
+
+    В корзине клетки y * cols + x лежат номера призраков (индексы в GameState.ghosts),
+    у которых grid_x, grid_y указывают на эту клетку. Призрак перекладывается в другую
+    корзину, только когда меняет клетку, поэтому обновление почти ничего не стоит.
+    """
+    def __init__(self, cols, actors): # noqa
+        self.cols = cols
+        self.buckets = {}
+        self.keys = []  # Номер призрака -> его клетка
+        self.found = []  # Буфер ответа near(), переиспользуется между вызовами
+        for number, actor in enumerate(actors):
+            key = actor.grid_y * cols + actor.grid_x
+            self.keys.append(key)
+            self.buckets.setdefault(key, []).append(number)
+
+    def move(self, number, key):
+        """Перекладывает призрака number в корзину клетки key"""
+        bucket = self.buckets[self.keys[number]]
+        bucket.remove(number)
+        if not bucket:
+            del self.buckets[self.keys[number]]
+        self.keys[number] = key
+        self.buckets.setdefault(key, []).append(number)
+
+    def near(self, x, y, radius=1):
+        """Номера призраков в квадрате клеток со стороной 2 * radius + 1 вокруг (x, y), по возрастанию.
+
+        Возвращается внутренний буфер: он действителен до следующего вызова near.
+        """
+        buckets, cols = self.buckets, self.cols
+        found = self.found
+        found.clear()
+        for ny in range(y - radius, y + radius + 1):
+            for key in range(ny * cols + x - radius, ny * cols + x + radius + 1):
+                bucket = buckets.get(key)
+                if bucket:
+                    found += bucket
+        found.sort()
+        return found
+
+
+# --- КЛАССЫ ---
+class Player:
+    # Слоты вместо __dict__: атрибуты дешевле по памяти и по времени доступа
+    __slots__ = ("level", "grid_x", "grid_y", "pix_x", "pix_y", "code", "next_code", "buffer_code", "speed",
+                 "mouth_angle", "mouth_opening", "animation_frame", "is_alive", "death_frame", "immune_timer",
+                 "portal_cooldown", "death_animation_frames", "death_animation_speed")
+
+    def __init__(self, x, y, level=LEVEL): # noqa
+        self.level = level
+        self.grid_x = x
+        self.grid_y = y
+        self.pix_x = x * TILE_SIZE
+        self.pix_y = y * TILE_SIZE
+        self.code = STOP_CODE  # Направление движения — код (индекс в VECTORS)
+        self.next_code = STOP_CODE
+        self.buffer_code = STOP_CODE
+        self.speed = 1.5
+        self.mouth_angle = 0
+        self.mouth_opening = True
+        self.animation_frame = 0
+        self.is_alive = True
+        self.death_frame = 0
+        self.immune_timer = 120  # Иммунитет после смерти
+        self.portal_cooldown = 0
+        self.death_animation_frames = 60  # Количество кадров анимации смерти
+        self.death_animation_speed = 2  # Скорость анимации смерти
+
+    @property
+    def direction(self):
+        """Направление движения вектором (dx, dy)"""
+        return VECTORS[self.code]
+
+    @direction.setter
+    def direction(self, direction):
+        self.code = CODES[direction]
+
+    @property
+    def next_direction(self):
+        return VECTORS[self.next_code]
+
+    @next_direction.setter
+    def next_direction(self, direction):
+        self.next_code = CODES[direction]
+
+    def update(self):
+        if not self.is_alive:
+            self.death_frame += self.death_animation_speed
+            if self.death_frame > self.death_animation_frames:
+                self.is_alive = True
+                self.death_frame = 0
+                self.immune_timer = 180
+                # Возвращаем в стартовую позицию карты
+                self.grid_x, self.grid_y = self.level.player_spawn
+                self.pix_x, self.pix_y = self.grid_x * TILE_SIZE, self.grid_y * TILE_SIZE
+                self.code = STOP_CODE
+            return
+
+        # Уменьшаем таймер иммунитета, если он активен
+        if self.immune_timer > 0:
+            self.immune_timer -= 1
+
+        if self.portal_cooldown > 0:
+            self.portal_cooldown -= 1
+
+        at_center = (
+                abs(self.pix_x - self.grid_x * TILE_SIZE) < 2 and
+                abs(self.pix_y - self.grid_y * TILE_SIZE) < 2
+        )
+
+        if at_center:
+            if self.can_move(self.next_code):
+                self.code = self.next_code
+                self.next_code = STOP_CODE
+            elif self.can_move(self.buffer_code):
+                self.code = self.buffer_code
+                self.buffer_code = STOP_CODE
+
+        if not self.can_move(self.code):
+            self.code = STOP_CODE
+            self.pix_x = self.grid_x * TILE_SIZE
+            self.pix_y = self.grid_y * TILE_SIZE
+        else:
+            self.pix_x += DX[self.code] * self.speed
+            self.pix_y += DY[self.code] * self.speed
+
+        self.grid_x = round(self.pix_x / TILE_SIZE)
+        self.grid_y = round(self.pix_y / TILE_SIZE)
+
+        # Телепортация на противоположный край карты
+        if self.portal_cooldown == 0:
+            portal = self.level.portal_exits.get(self.grid_y * self.level.cols + self.grid_x)
+            if portal is not None:
+                self.grid_y, self.grid_x = divmod(portal[1], self.level.cols)
+                # Переносится только координата вдоль оси портала
+                if DX[portal[0]]:
+                    self.pix_x = self.grid_x * TILE_SIZE
+                else:
+                    self.pix_y = self.grid_y * TILE_SIZE
+                self.portal_cooldown = 10
+
+        # Анимация рта
+        speed = 5
+        if self.mouth_opening:
+            self.mouth_angle = min(self.mouth_angle + speed, 50)  # Максимальный угол
+        else:
+            self.mouth_angle = max(self.mouth_angle - speed, 0)  # Минимальный угол
+
+        # Переключение направления анимации
+        if self.mouth_angle >= 50:
+            self.mouth_opening = False
+        elif self.mouth_angle <= 0:
+            self.mouth_opening = True
+
+    def can_move(self, code):
+        """code — код направления; для STOP_CODE всегда False"""
+        level = self.level
+        return level.moves[self.grid_y * level.cols + self.grid_x] >> code & 1 == 1
+
+
+class Personality:
+    """Характер призрака. Объект общий для всех призраков одного цвета на поле одного размера"""
+    __slots__ = ("name", "scatter_pos", "chase_mode", "speed_boost", "scatter_ticks", "chase_ticks")
+
+    def __init__(self, name, scatter_pos, chase_mode, speed_boost, scatter_duration, chase_duration): # noqa
+        self.name = name
+        self.scatter_pos = scatter_pos
+        self.chase_mode = chase_mode
+        self.speed_boost = speed_boost
+        self.scatter_ticks = scatter_duration * FPS
+        self.chase_ticks = chase_duration * FPS
+
+
+# Цвет -> (имя, угол разбегания (справа, снизу), режим погони, множитель скорости,
+#          секунд разбегания, секунд погони)
+PERSONALITIES = {
+    RED: ("Blinky", (True, False), "direct", 1.05, 7, 20),
+    PINK: ("Pinky", (False, False), "ambush", 1.0, 7, 20),
+    CYAN: ("Inky", (True, True), "mirror", 0.95, 5, 20),
+    ORANGE: ("Clyde", (False, True), "random", 0.9, 5, 20),
+}
+DEFAULT_PERSONALITIES = dict(PERSONALITIES)
+PERSONALITY_FIELDS = ("chase_mode", "speed_boost", "scatter_duration", "chase_duration")
+CHASE_MODES = ("direct", "ambush", "mirror", "random")
+GHOST_SPEEDS = (0.6, 1.0, 1.4)  # Базовая скорость призраков по сложности (Menu.difficulty 1–3)
+_personality_tables = {}
+
+
+def personality_table(cols, rows):
+    """Характеры по цветам для поля cols x rows (от размера зависят углы разбегания)"""
+    table = _personality_tables.get((cols, rows))
+    if table is None:
+        table = _personality_tables[cols, rows] = {
+            color: Personality(name, (cols - 2 if right else 1, rows - 2 if bottom else 1), *rest)
+            for color, (name, (right, bottom), *rest) in PERSONALITIES.items()
+        }
+    return table
+
+
+def set_personalities(overrides=None):
+    """Меняет характеры для партий, созданных после вызова (подбор параметров в tournament.py).
+
+    overrides — {имя призрака: {поле: значение}} с полями из PERSONALITY_FIELDS;
+    None — стандартные характеры.
+    """
+    overrides = dict(overrides or {})
+    for color, (name, corner, *fields) in DEFAULT_PERSONALITIES.items():
+        changes = overrides.pop(name, {})
+        unknown = set(changes) - set(PERSONALITY_FIELDS)
+        if unknown:
+            raise ValueError(f"{name}: неизвестные параметры характера {', '.join(sorted(unknown))}")
+        if changes.get("chase_mode", fields[0]) not in CHASE_MODES:
+            raise ValueError(f"{name}: неизвестный режим погони {changes['chase_mode']!r}")
+        PERSONALITIES[color] = (name, corner, *(changes.get(field, value)
+                                                for field, value in zip(PERSONALITY_FIELDS, fields)))
+    if overrides:
+        raise ValueError(f"неизвестные призраки: {', '.join(sorted(overrides))}")
+    _personality_tables.clear()
+
+
+class Ghost:
+    __slots__ = ("rng", "level", "maze", "board", "grid_x", "grid_y", "pix_x", "pix_y", "color", "base_speed",
+                 "speed", "code", "target", "partner", "personality", "state", "state_timer", "frightened_timer",
+                 "last_decision_cell", "portal_cooldown", "last_portal", "wave_offset", "respawn_timer",
+                 "is_in_house", "respawn_position", "is_returning_home", "frightened_color", "normal_color",
+                 "home_exit_pos", "start_position", "is_active")
+
+    def __init__(self, x, y, color, speed, rng=random, level=LEVEL): # noqa
+        self.rng = rng  # Источник случайности партии (random.Random с зерном)
+        self.level = level
+        self.maze = level.index
+        # Углы разбегания и случайные цели — по полю не меньше окна (классическая карта ниже окна)
+        self.board = (max(COLS, level.cols), max(ROWS, level.rows))
+        self.grid_x = x
+        self.grid_y = y
+        self.pix_x = x * TILE_SIZE
+        self.pix_y = y * TILE_SIZE
+        self.color = color
+        self.base_speed = speed
+        self.code = STOP_CODE  # Направление движения — код (индекс в VECTORS)
+        self.target = None
+        self.partner = None  # Blinky, от которого Inky отражает цель (назначает GameState)
+        self.personality = self.set_personality()
+        self.speed = speed * self.personality.speed_boost
+        self.state = "scatter"  # scatter | chase | frightened
+        self.state_timer = 0
+        self.frightened_timer = 0
+        self.last_decision_cell = y * level.cols + x  # Клетка последнего решения (y * cols + x, -1 — нет)
+        self.portal_cooldown = 0  # Таймер задержки после телепортации
+        self.last_portal = None  # Клетка выхода последнего использованного портала
+        self.wave_offset = 0
+        self.respawn_timer = 0
+        self.is_in_house = True  # Начинаем в доме
+        self.respawn_position = (x, y)  # Позиция для возрождения
+        self.is_returning_home = False
+        self.frightened_color = BLUE  # Цвет в испуганном состоянии
+        self.normal_color = color  # Оригинальный цвете
+        self.home_exit_pos = (12, 15)  # Позиция выхода из дома
+        self.start_position = (x, y)  # Сохраняем стартовые позиции
+        self.is_active = True  # Флаг активности призрака
+        # Инициализация первого направления
+        codes = MASK_CODES[self.possible_moves()]
+        if codes:
+            self.code = self.rng.choice(codes)
+
+    @property
+    def direction(self):
+        """Направление движения вектором (dx, dy)"""
+        return VECTORS[self.code]
+
+    @direction.setter
+    def direction(self, direction):
+        self.code = CODES[direction]
+
+    def reset(self):
+        self.grid_x, self.grid_y = self.start_position
+        self.pix_x = self.grid_x * TILE_SIZE
+        self.pix_y = self.grid_y * TILE_SIZE
+        self.state = "scatter"
+        self.color = self.normal_color
+        self.is_active = True
+
+        codes = MASK_CODES[self.possible_moves()]
+        if codes:
+            self.code = self.rng.choice(codes)
+        else:
+            self.code = STOP_CODE
+
+    def reset_to_start(self):
+        """Возвращает призрака на стартовую позицию"""
+        self.grid_x, self.grid_y = self.start_position
+        self.pix_x, self.pix_y = self.grid_x * TILE_SIZE, self.grid_y * TILE_SIZE
+        self.state = "scatter"
+        self.color = self.normal_color
+        self.code = STOP_CODE
+        self.respawn_timer = FPS * 2  # 2 секунды перед возрождением
+
+    def set_personality(self):
+        return personality_table(*self.board).get(self.color)
+
+    def update(self, player, ghosts): # noqa
+        # Анимация волны
+        self.wave_offset += 0.2
+
+        # Призрак был съеден — идёт в дом
+        if self.state == "eaten":
+            self.return_to_home()
+            return
+
+        # Призрак в доме — ожидает возрождение
+        if self.state == "respawning":
+            self.respawn_timer -= 1
+            if self.respawn_timer <= 0:
+                self.reset()
+            return
+
+        # Призрак отключён — ничего не делает
+        if not self.is_active:
+            return
+
+        # Обычный цикл
+        self.update_state()
+        self.grid_x = round(self.pix_x / TILE_SIZE)
+        self.grid_y = round(self.pix_y / TILE_SIZE)
+
+        if self.at_decision_point():
+            self.last_decision_cell = self.grid_y * self.level.cols + self.grid_x
+            self.make_decision(player, ghosts)
+
+        self.move()
+        self.handle_portals()
+
+    def update_state(self):
+        """Управление состояниями scatter/chase/frightened"""
+        if self.state == "frightened":
+            self.frightened_timer -= 1
+            if self.frightened_timer <= 0:
+                self.state = "chase"
+                self.state_timer = 0
+                self.color = self.normal_color  # Возвращаем оригинальный цвет
+        else:
+            self.state_timer += 1
+            if self.state == "scatter" and self.state_timer > self.personality.scatter_ticks:
+                self.state = "chase"
+                self.state_timer = 0
+            elif self.state == "chase" and self.state_timer > self.personality.chase_ticks:
+                self.state = "scatter"
+                self.state_timer = 0
+
+    def set_frightened(self, duration):
+        if self.state != "eaten":  # Не действует на уже съеденных
+            self.state = "frightened"
+            self.frightened_timer = duration * FPS
+            self.color = self.frightened_color
+            # Разворачиваем призрака при испуге
+            if self.rng.random() > 0.5:
+                self.code = OPPOSITE[self.code]
+
+    def at_decision_point(self):
+        return (abs(self.pix_x - self.grid_x * TILE_SIZE) < 2 and
+                abs(self.pix_y - self.grid_y * TILE_SIZE) < 2)
+
+    def make_decision(self, player, ghosts): # noqa
+        mask = self.possible_moves()
+        if not mask:
+            return
+
+        # Запрет разворота на 180° (если есть другие варианты)
+        opposite = OPPOSITE[self.code]
+        if mask >> opposite & 1 and mask & (mask - 1):
+            mask &= ~(1 << opposite)
+
+        # Выбор цели в зависимости от состояния
+        if self.state == "frightened":
+            # Испуганный бродит случайно; случайная цель всё равно тянется из генератора,
+            # чтобы поток случайных чисел партии (и записи партий) не изменился
+            self.get_random_target()
+            self.code = self.rng.choice(MASK_CODES[mask])
+            return
+        if self.state == "scatter":
+            target_x, target_y = self.personality.scatter_pos
+        else:  # chase
+            target_x, target_y = self.get_chase_target(player, ghosts)
+
+        # Выбор оптимального направления
+        self.code = self.code_towards(mask, target_x, target_y)
+
+    def code_towards(self, mask, target_x, target_y):
+        """Код направления из маски mask, ведущего к цели кратчайшим путём по лабиринту"""
+        x, y, maze = self.grid_x, self.grid_y, self.maze
+        # Первый шаг кратчайшего пути берём из индекса, если он разрешён (бита NO_DIRECTION в маске нет)
+        hop = maze.next_code(x, y, target_x, target_y)
+        if mask >> hop & 1:
+            return hop
+
+        codes = MASK_CODES[mask]
+        distances = [maze.distance_xy(x + DX[code], y + DY[code], target_x, target_y) for code in codes]
+        min_dist = min(distances)
+        if min_dist == UNREACHABLE:
+            # Цель дальше окрестности индекса большой карты — идём к ней по прямой
+            distances = [(x + DX[code] - target_x) ** 2 + (y + DY[code] - target_y) ** 2 for code in codes]
+            min_dist = min(distances)
+        return self.rng.choice([code for code, dist in zip(codes, distances) if dist == min_dist])
+
+    def get_chase_target(self, player, ghosts): # noqa
+        """Персонализированные стратегии преследования"""
+        mode = self.personality.chase_mode
+
+        if mode == "direct":  # Blinky
+            return (player.grid_x, player.grid_y) # noqa
+
+        elif mode == "ambush":  # Pinky
+            target_x = player.grid_x + DX[player.code] * 4
+            target_y = player.grid_y + DY[player.code] * 4
+            return (target_x, target_y) # noqa
+
+        elif mode == "mirror":  # Inky
+            if self.partner is not None:
+                blinky = self.partner if self.partner.color == RED else None
+            else:
+                blinky = next((g for g in ghosts if g.color == RED), None)
+            if blinky:
+                dx = player.grid_x - blinky.grid_x
+                dy = player.grid_y - blinky.grid_y
+                return (player.grid_x + dx, player.grid_y + dy) # noqa
+            return (player.grid_x, player.grid_y) # noqa
+
+        else:  # Clyde
+            dist_to_player = self.maze.distance_xy(self.grid_x, self.grid_y, player.grid_x, player.grid_y)
+            if dist_to_player < 8:
+                return self.personality.scatter_pos
+            return (player.grid_x, player.grid_y) # noqa
+
+    def get_random_target(self):
+        """Случайная цель в режиме frightened"""
+        cols, rows = self.board
+        return (self.rng.randint(2, cols - 3), self.rng.randint(2, rows - 3)) # noqa
+
+    def possible_moves(self):
+        """Маска кодов направлений, в которые можно шагнуть из текущей клетки"""
+        level = self.level
+        return level.moves[self.grid_y * level.cols + self.grid_x]
+
+    def move(self):
+        """Движение с учетом текущей скорости"""
+        speed = self.speed
+        if self.state == "frightened":
+            speed *= 0.5  # Замедление в frightened режиме
+
+        self.pix_x += DX[self.code] * speed
+        self.pix_y += DY[self.code] * speed
+
+    def handle_portals(self):
+        """Обработка телепортации через порталы"""
+        if self.portal_cooldown > 0:
+            self.portal_cooldown -= 1
+            return
+
+        # Проверяем, что призрак находится в центре тайла
+        at_center = (
+                abs(self.pix_x - self.grid_x * TILE_SIZE) < 2 and
+                abs(self.pix_y - self.grid_y * TILE_SIZE) < 2
+        )
+
+        if not at_center:
+            return
+
+        # Проверяем, что находимся на портале
+        current_portal = self.grid_y * self.level.cols + self.grid_x
+        portal = self.level.portal_exits.get(current_portal)
+        if portal is not None:
+            # Если это новый портал (не тот, к которому только что вышли)
+            if current_portal != self.last_portal:
+                code, exit_cell = portal
+                if code == self.code:  # Уходим за край карты
+                    # Появляемся на клетку дальше выхода, продолжая движение
+                    exit_y, exit_x = divmod(exit_cell, self.level.cols)
+                    self.grid_x = exit_x + DX[code]
+                    self.grid_y = exit_y + DY[code]
+                    if DX[code]:
+                        self.pix_x = self.grid_x * TILE_SIZE
+                    else:
+                        self.pix_y = self.grid_y * TILE_SIZE
+                    self.last_portal = exit_cell
+                    self.portal_cooldown = 15
+            else:
+                self.last_portal = None
+
+    def can_move(self, code):
+        """code — код направления; для STOP_CODE всегда False"""
+        return self.possible_moves() >> code & 1 == 1
+
+    def handle_eaten(self):
+        self.state = "eaten"
+        self.color = WHITE
+        self.is_active = False
+        self.respawn_timer = 0  # пока не нужен
+        self.last_decision_cell = -1  # Путь домой выбираем с ближайшего центра клетки
+
+    def return_to_home(self):
+        """Возвращение съеденного призрака домой по полю направлений лабиринта"""
+        level = self.level
+        cell = self.grid_y * level.cols + self.grid_x
+        if self.at_decision_point() and (cell != self.last_decision_cell or self.code == STOP_CODE):
+            self.last_decision_cell = cell
+            self.pix_x = self.grid_x * TILE_SIZE
+            self.pix_y = self.grid_y * TILE_SIZE
+
+            # Если уже дома - запускаем respawn
+            start_x, start_y = self.start_position
+            if self.grid_x == start_x and self.grid_y == start_y:
+                self.state = "respawning"
+                self.respawn_timer = FPS * 3
+                return
+
+            code = self.maze.flow_field(self.start_position)[cell]
+            self.code = STOP_CODE if code == NO_DIRECTION else code
+
+            # Шаг через портал — сразу переносимся на противоположный край
+            portal = level.portal_exits.get(cell)
+            if portal is not None and portal[0] == code:
+                self.grid_y, self.grid_x = divmod(portal[1], level.cols)
+                self.pix_x = self.grid_x * TILE_SIZE
+                self.pix_y = self.grid_y * TILE_SIZE
+                self.last_decision_cell = portal[1]
+                return
+
+        # Двигаемся с увеличенной скоростью (x2)
+        speed = self.base_speed * 2
+        self.pix_x += DX[self.code] * speed
+        self.pix_y += DY[self.code] * speed
+
+        # Обновляем позицию в сетке
+        self.grid_x = round(self.pix_x / TILE_SIZE)
+        self.grid_y = round(self.pix_y / TILE_SIZE)
+
+
+# --- МОНЕТЫ И БОНУСЫ ---
+EMPTY = 0
+COIN = 1
+BONUS = 2
+ENERGIZER = 3
+
+PELLET_TILES = {'0': COIN, 'B': BONUS, 'E': ENERGIZER}
+
+
+class PelletGrid:
+    """Монеты и бонусы в bytearray по клеткам карты (y * cols + x) со счётчиками оставшихся.
+
+    Сбор — одно обращение к клетке игрока, проверка победы — сравнение счётчика с нулём.
+    Клетки копируются при записи: после share() массив общий со слепком (snapshot.py)
+    и копируется только при первом съеденном предмете.
+    """
+    def __init__(self, grid): # noqa
+        self.rows = len(grid)
+        self.cols = len(grid[0])
+        self.cells = bytearray(PELLET_TILES.get(tile, EMPTY) for row in grid for tile in row)
+        self.coins_left = self.cells.count(COIN)
+        self.bonuses_left = len(self.cells) - self.coins_left - self.cells.count(EMPTY)
+        self.taken = []  # Клетки, опустевшие с последней отрисовки (очищает отрисовщик)
+        self.shared = False  # cells делится с кем-то ещё — перед записью нужна своя копия
+
+    @property
+    def remaining(self):
+        return self.coins_left + self.bonuses_left
+
+    def take(self, x, y):
+        """Забирает то, что лежит в клетке (x, y), и возвращает его вид (EMPTY, если пусто)"""
+        if not (0 <= x < self.cols and 0 <= y < self.rows):
+            return EMPTY
+        i = y * self.cols + x
+        kind = self.cells[i]
+        if kind:
+            if self.shared:
+                self.cells = bytearray(self.cells)
+                self.shared = False
+            self.cells[i] = EMPTY
+            self.taken.append(i)
+            if kind == COIN:
+                self.coins_left -= 1
+            else:
+                self.bonuses_left -= 1
+        return kind
+
+    def share(self):
+        """Клетки, которые можно хранить, не копируя: эта сетка скопирует их перед записью"""
+        self.shared = True
+        return self.cells
+
+
+# --- СОСТОЯНИЕ ПАРТИИ ---
+class GameState:
+    """Всё, что нужно для продолжения партии: игрок, призраки, монеты, бонусы, очки и жизни.
+
+    status: playing | game_over | win
+    events: звуковые события последнего тика (chomp, death, eat_ghost, power_up, win)
+    seed: зерно генератора партии; одинаковые зерно, сложность и ввод дают одинаковую партию
+    level: скомпилированная карта (по умолчанию — классическая)
+    ghost_count: число призраков (по умолчанию — по стартовым позициям карты); больше — режим роя:
+    лишние призраки появляются в тех же клетках дома со слегка случайной скоростью
+    vectorized: призраки в массивах NumPy (swarm.GhostArrays) вместо объектов Ghost
+    ghost_speed: базовая скорость призраков (по умолчанию — GHOST_SPEEDS по сложности)
+    """
+    def __init__(self, difficulty=1, score=0, seed=None, level=LEVEL, ghost_count=None, vectorized=False, # noqa
+                 ghost_speed=None):
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.difficulty = difficulty
+        self.ghost_speed = GHOST_SPEEDS[difficulty - 1] if ghost_speed is None else ghost_speed
+        self.score = score  # Текущий счёт (сохраняется между уровнями)
+        self.lives = 3
+        self.status = "playing"
+        self.tick = 0
+        self.events = []
+
+        self.level = level
+        self.pellets = PelletGrid(level.grid)
+
+        # Спавн игрока
+        self.player = Player(*level.player_spawn, level)
+
+        # Спавн призраков внутри коробки (координаты области H)
+        colors = [RED, PINK, CYAN, ORANGE]
+        spawns = level.ghost_spawns
+        self.ghost_count = len(spawns) if ghost_count is None else ghost_count
+        self.vectorized = vectorized
+        self.swarm = None
+        if vectorized:
+            from .swarm import GhostArrays
+            speeds = [self.ghost_speed if i < len(spawns) else self.ghost_speed * self.rng.uniform(0.8, 1.0)
+                      for i in range(self.ghost_count)]
+            self.swarm = GhostArrays(level, [spawns[i % len(spawns)] for i in range(self.ghost_count)],
+                                     [colors[i % len(colors)] for i in range(self.ghost_count)],
+                                     speeds, self.rng.getrandbits(64))
+            self.ghosts = self.swarm.views
+            self.ghost_index = None
+            return
+
+        self.ghosts = []
+        for i in range(self.ghost_count):
+            speed = self.ghost_speed
+            if i >= len(spawns):
+                speed *= self.rng.uniform(0.8, 1.0)  # Рой растягивается, а не ходит одним комом
+            self.ghosts.append(Ghost(*spawns[i % len(spawns)], colors[i % len(colors)], speed, self.rng, level))
+        for i, ghost in enumerate(self.ghosts): # noqa
+            ghost.home_exit_pos = spawns[0]  # Позиция выхода из дома
+            if ghost.color == CYAN:
+                ghost.partner = self.ghosts[i - i % len(colors)]  # Blinky той же четвёрки
+        # Поле пути домой строится заранее (на большой карте это обход всего лабиринта)
+        for x, y in spawns:
+            level.index.flow_field((x, y))
+        self.ghost_index = SpatialHash(level.cols, self.ghosts)
+
+    # --- СЛЕПКИ (snapshot.py) ---
+    def snapshot(self):
+        """Слепок партии для отката и копий; партию можно продолжать"""
+        from .snapshot import take_snapshot
+        return take_snapshot(self)
+
+    def restore(self, snap):
+        """Откат к слепку этой же партии (той же карты и числа призраков)"""
+        from .snapshot import restore
+        return restore(self, snap)
+
+    def clone(self):
+        """Независимая копия партии: дальше они идут каждая своим путём"""
+        from .snapshot import clone
+        return clone(self)
+
+
+def step(state, inputs=None, timer=None):
+    """Продвигает партию на один тик.
+
+    inputs — направление (dx, dy), выбранное игроком на этом тике, или None.
+    timer — необязательная отметка конца фазы (FrameProfiler.mark).
+    Возвращает список событий тика — state.events, который очищается и заполняется заново
+    каждый тик (чтобы сохранить события, их нужно скопировать).
+    """
+    events = state.events
+    events.clear()
+    if state.status != "playing":
+        return events
+
+    player = state.player
+    ghosts = state.ghosts
+    if inputs is not None:
+        player.next_code = CODES[inputs]
+
+    # Обновление объектов
+    state.tick += 1
+    player.update()
+    if timer: timer("player")
+    px, py = player.pix_x + 4, player.pix_y + 4
+    size = TILE_SIZE - 8
+    swarm = state.swarm
+    if swarm is not None:
+        swarm.step((player.grid_x,), (player.grid_y,), (player.code,))
+        if timer: timer("ghosts")
+        candidates = swarm.touching(px, py, size)
+    else:
+        index = state.ghost_index
+        keys, cols = index.keys, index.cols
+        for number, ghost in enumerate(ghosts):
+            ghost.update(player, ghosts)
+            key = ghost.grid_y * cols + ghost.grid_x
+            if key != keys[number]:
+                index.move(number, key)
+        if timer: timer("ghosts")
+        # Задеть игрока могут только призраки из соседних клеток
+        candidates = index.near(player.grid_x, player.grid_y)
+
+    # Проверка столкновений с призраками
+    for number in candidates:
+        ghost = ghosts[number]
+        if (rects_collide(px, py, size, size, ghost.pix_x + 4, ghost.pix_y + 4, size, size)
+                and player.is_alive):
+            if ghost.state == "frightened":
+                ghost.handle_eaten()
+                state.score += 200
+                events.append("eat_ghost")
+            elif ghost.state != "eaten" and player.immune_timer <= 0:
+                state.lives -= 1
+                player.is_alive = False
+                events.append("death")
+                if state.lives <= 0:
+                    state.status = "game_over"
+    if timer: timer("collisions")
+
+    # Сбор монет и бонусов в клетке игрока
+    kind = state.pellets.take(player.grid_x, player.grid_y)
+    if kind == COIN:
+        state.score += 10
+        events.append("chomp")
+    elif kind:
+        state.score += 100 if kind == ENERGIZER else 50
+        events.append("power_up")
+
+        if kind == ENERGIZER:
+            if swarm is not None:
+                swarm.frighten(5)
+            else:
+                for ghost in ghosts:
+                    if ghost.state != "eaten":
+                        ghost.set_frightened(5)
+
+    # Проверка условия победы
+    if state.pellets.remaining == 0:
+        state.status = "win"
+        events.append("win")
+    if timer: timer("pellets")
+
+    return events
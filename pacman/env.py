@@ -0,0 +1,132 @@
+"""Среда для обучения агентов: reset/step поверх engine без окна и главного цикла.
+
+Действие — код направления (индекс в DIRECTIONS) или NOOP (ввода нет).
+Наблюдение — массив NumPy uint8 формы (CHANNELS, rows, cols): по каналу
+на стены, монеты и бонусы, энерджайзеры, призраков по состояниям и игрока.
+Оно собирается прямо из состояния партии (PelletGrid.cells читается без копирования),
+а не отрисовкой и чтением пикселей. Пиксели — по запросу: render() рисует кадр
+на поверхность (свою или переданную, например game_surface главного цикла)
+и отдаёт представление pygame.surfarray.pixels3d этой поверхности без копии.
+
+    from pacman.env import PacManEnv
+    env = PacManEnv(difficulty=2)
+    obs, info = env.reset(seed=1)
+    obs, reward, terminated, truncated, info = env.step(action)
+
+Нужен NumPy; для render() — ещё и pygame.
+"""
+import numpy as np
+
+from .settings import LOGICAL_WIDTH, LOGICAL_HEIGHT
+from .maze import DIRECTIONS
+from .level import LEVEL
+from .engine import GameState, step, COIN, BONUS, ENERGIZER
+
+# Каналы наблюдения
+WALLS, PELLETS, ENERGIZERS, GHOSTS_SCATTER, GHOSTS_CHASE, GHOSTS_FRIGHTENED, GHOSTS_EATEN, PLAYER = range(8)
+CHANNELS = 8
+CHANNEL_NAMES = ("walls", "pellets", "energizers", "ghosts_scatter", "ghosts_chase", "ghosts_frightened",
+                 "ghosts_eaten", "player")
+# Состояние призрака -> канал (съеденные и ждущие в доме безопасны, у них общий канал)
+GHOST_CHANNELS = {"scatter": GHOSTS_SCATTER, "chase": GHOSTS_CHASE, "frightened": GHOSTS_FRIGHTENED,
+                  "eaten": GHOSTS_EATEN, "respawning": GHOSTS_EATEN}
+# Код состояния swarm.GhostArrays (индекс в swarm.STATE_NAMES) -> канал
+GHOST_STATE_CHANNELS = np.array([GHOSTS_SCATTER, GHOSTS_CHASE, GHOSTS_FRIGHTENED, GHOSTS_EATEN, GHOSTS_EATEN])
+
+NOOP = len(DIRECTIONS)
+ACTIONS = len(DIRECTIONS) + 1
+
+
+class PacManEnv:
+    """Одна партия за интерфейсом reset/step.
+
+    Награда за тик — прирост счёта. terminated — партия закончилась (победа
+    или конец жизней), truncated — прошло max_ticks тиков (None — без ограничения).
+    Остальные параметры — как у GameState; surface — поверхность для render()
+    (по умолчанию своя, размером с кадр игры).
+    """
+    def __init__(self, difficulty=1, level=LEVEL, ghost_count=None, vectorized=False, max_ticks=None, # noqa
+                 surface=None):
+        self.difficulty = difficulty
+        self.level = level
+        self.ghost_count = ghost_count
+        self.vectorized = vectorized
+        self.max_ticks = max_ticks
+        self.state = None
+        self.shape = (CHANNELS, level.rows, level.cols)
+        self.walls = np.frombuffer(level.walkable, dtype=np.uint8).reshape(level.rows, level.cols) ^ 1
+        self.surface = surface
+        self.renderer = None
+        self.font = None
+
+    def reset(self, seed=None):
+        """Новая партия; возвращает (наблюдение, info)"""
+        self.state = GameState(self.difficulty, seed=seed, level=self.level, ghost_count=self.ghost_count,
+                               vectorized=self.vectorized)
+        if self.renderer is not None:
+            self.renderer.invalidate()
+        return self.observation(), self.info()
+
+    def step(self, action):
+        """Тик партии с действием action; возвращает (наблюдение, награда, terminated, truncated, info)"""
+        state = self.state
+        if state is None:
+            raise RuntimeError("перед step нужно вызвать reset")
+        if not 0 <= action < ACTIONS:
+            raise ValueError(f"действие должно быть от 0 до {ACTIONS - 1}, получено {action}")
+        score = state.score
+        step(state, None if action == NOOP else DIRECTIONS[action])
+        terminated = state.status != "playing"
+        truncated = not terminated and self.max_ticks is not None and state.tick >= self.max_ticks
+        return self.observation(), state.score - score, terminated, truncated, self.info()
+
+    def info(self):
+        state = self.state
+        return {"score": state.score, "lives": state.lives, "tick": state.tick, "status": state.status,
+                "events": list(state.events)}  # state.events переиспользуется следующим тиком
+
+    # --- НАБЛЮДЕНИЯ ---
+    def observation(self):
+        """Сетка клеток по каналам (см. CHANNEL_NAMES), собранная из состояния партии"""
+        state, level = self.state, self.level
+        obs = np.zeros(self.shape, dtype=np.uint8)
+        obs[WALLS] = self.walls
+        cells = np.frombuffer(state.pellets.cells, dtype=np.uint8).reshape(level.rows, level.cols)
+        obs[PELLETS] = (cells == COIN) | (cells == BONUS)
+        obs[ENERGIZERS] = cells == ENERGIZER
+
+        x, y, channel = self.ghost_cells()
+        obs[channel, np.clip(y, 0, level.rows - 1), np.clip(x, 0, level.cols - 1)] = 1
+        player = state.player
+        obs[PLAYER, min(max(player.grid_y, 0), level.rows - 1), min(max(player.grid_x, 0), level.cols - 1)] = 1
+        return obs
+
+    def ghost_cells(self):
+        """Клетки призраков и их каналы массивами"""
+        swarm = self.state.swarm
+        if swarm is not None:
+            return swarm.grid_x, swarm.grid_y, GHOST_STATE_CHANNELS[swarm.state]
+        ghosts = self.state.ghosts
+        return (np.array([ghost.grid_x for ghost in ghosts]), np.array([ghost.grid_y for ghost in ghosts]),
+                np.array([GHOST_CHANNELS[ghost.state] for ghost in ghosts], dtype=np.int64))
+
+    # --- ПИКСЕЛИ ---
+    def render(self, high_score=0):
+        """Рисует текущий кадр и возвращает его пиксели (ширина, высота, 3) без копирования.
+
+        Массив — представление поверхности: пока он жив, поверхность заблокирована,
+        поэтому его нужно отпустить (del) до следующего render().
+        """
+        import pygame
+        from .render import renderer_for
+        if self.surface is None:
+            self.surface = pygame.Surface((LOGICAL_WIDTH, LOGICAL_HEIGHT))
+        if self.renderer is None:
+            self.renderer = renderer_for(self.level)
+        if self.font is None:
+            if not pygame.font.get_init():
+                pygame.font.init()
+            self.font = pygame.font.SysFont("Arial", 24)
+        self.renderer.draw(self.surface, self.state, high_score, self.font)
+        return pygame.surfarray.pixels3d(self.surface)
+
@@ -0,0 +1,211 @@
+"""Таблица рекордов: лучшие партии каждой сложности в SQLite (режим WAL).
+
+Игра не ждёт диска: база открывается, читается и пишется в фоновом потоке.
+Таблица читается в память один раз за запуск, best() и top() отвечают из памяти;
+submit() сразу кладёт результат в память и ставит его в очередь на запись.
+Каждая запись — одна транзакция: вставка и обрезка сложности до top строк.
+Тот же поток пишет файлы записей партий (save_replay), на которые ссылается таблица.
+Рекорд из старого highscore.txt переносится при создании базы. Просмотр:
+
+    python -m pacman.leaderboard FILE
+"""
+import argparse
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from functools import partial
+
+TOP_N = 10  # Строк на сложность
+SCHEMA_VERSION = 1
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS scores (
+        id INTEGER PRIMARY KEY,
+        difficulty INTEGER NOT NULL,
+        score INTEGER NOT NULL,
+        level TEXT NOT NULL,
+        created REAL NOT NULL,
+        replay TEXT
+    )""",
+    "CREATE INDEX IF NOT EXISTS scores_by_difficulty ON scores (difficulty, score DESC, created)",
+)
+COLUMNS = "difficulty, score, level, created, replay"
+
+
+class Entry:
+    """Строка таблицы: сложность, счёт, карта, время (секунды эпохи) и имя файла записи партии"""
+    __slots__ = ("difficulty", "score", "level", "created", "replay")
+
+    def __init__(self, difficulty, score, level="classic", created=None, replay=None): # noqa
+        self.difficulty = difficulty
+        self.score = score
+        self.level = level
+        self.created = time.time() if created is None else created
+        self.replay = replay
+
+    def key(self):
+        """Порядок в таблице: больший счёт выше, при равном — более ранний"""
+        return -self.score, self.created
+
+
+class Leaderboard:
+    """Таблица рекордов в файле path; legacy — старый файл рекорда (переносится в сложность 1)"""
+    def __init__(self, path, legacy=None, top=TOP_N): # noqa
+        self.path = path
+        self.legacy = legacy
+        self.top_n = top
+        self.entries = {}  # Сложность -> строки по порядку таблицы
+        self.lock = threading.Lock()
+        self.jobs = queue.Queue()  # Функции job(db) для фонового потока; None — остановка
+        self.loaded = threading.Event()  # База прочитана (или не открылась)
+        self.error = None  # Последняя ошибка базы
+        self.thread = threading.Thread(target=self.run, name="leaderboard", daemon=True)
+        self.thread.start()
+
+    # --- ПАМЯТЬ (поток игры) ---
+    def best(self, difficulty):
+        """Рекорд сложности (0, если рекордов нет или база ещё не прочитана)"""
+        with self.lock:
+            entries = self.entries.get(difficulty)
+            return entries[0].score if entries else 0
+
+    def top(self, difficulty):
+        with self.lock:
+            return list(self.entries.get(difficulty, ()))
+
+    def submit(self, difficulty, score, level="classic", replay=None):
+        """Добавляет результат партии; возвращает место в таблице (1 — рекорд) или None"""
+        entry = Entry(difficulty, score, level, replay=replay)
+        with self.lock:
+            rank = self.insert(entry)
+        # Пишется и не попавший в таблицу: до чтения базы память неполна
+        self.jobs.put(partial(self.write, entry=entry))
+        return rank
+
+    def save_replay(self, replay, path):
+        """Записывает партию replay в файл path в фоновом потоке (папка создаётся при необходимости)"""
+        self.jobs.put(partial(write_file, path=path, data=replay.to_bytes()))
+
+    def insert(self, entry):
+        entries = self.entries.setdefault(entry.difficulty, [])
+        entries.append(entry)
+        entries.sort(key=Entry.key)
+        del entries[self.top_n:]
+        return entries.index(entry) + 1 if entry in entries else None
+
+    def close(self, timeout=2.0):
+        """Дописывает очередь, но ждёт диск не дольше timeout секунд"""
+        self.jobs.put(None)
+        self.thread.join(timeout)
+
+    # --- БАЗА (фоновый поток) ---
+    def run(self):
+        db = None
+        try:
+            db = self.connect()
+            rows = self.load(db)
+        except (sqlite3.Error, OSError) as error:
+            self.fail(error)
+            db = None  # Без базы поток всё равно пишет файлы записей
+        else:
+            with self.lock:
+                for entry in rows:
+                    self.insert(entry)
+        self.loaded.set()
+
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            try:
+                job(db)
+            except OSError as error:
+                print(f"Ошибка при сохранении записи: {error}")
+            except sqlite3.Error as error:
+                self.fail(error)
+        if db is not None:
+            db.close()
+
+    def connect(self):
+        db = sqlite3.connect(self.path, timeout=10.0)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")  # В WAL этого хватает, чтобы сбой не портил базу
+        if db.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+            with db:
+                for statement in SCHEMA:
+                    db.execute(statement)
+                legacy = self.read_legacy()
+                if legacy is not None:
+                    db.execute(f"INSERT INTO scores ({COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                               (legacy.difficulty, legacy.score, legacy.level, legacy.created, legacy.replay))
+                db.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        return db
+
+    def read_legacy(self):
+        """Рекорд из старого файла (в нём не было сложности — считаем его рекордом сложности 1)"""
+        if not self.legacy:
+            return None
+        try:
+            with open(self.legacy, 'r') as f:
+                score = int(f.read())
+            created = os.path.getmtime(self.legacy)
+        except (OSError, ValueError):
+            return None
+        return Entry(1, score, created=created) if score > 0 else None
+
+    def load(self, db):
+        rows = []
+        for difficulty, in db.execute("SELECT DISTINCT difficulty FROM scores").fetchall():
+            rows += (Entry(*row) for row in db.execute(
+                f"SELECT {COLUMNS} FROM scores WHERE difficulty = ? ORDER BY score DESC, created LIMIT ?",
+                (difficulty, self.top_n)))
+        return rows
+
+    def write(self, db, entry):
+        if db is None:
+            return  # База не открылась — об этом уже сказано
+        with db:
+            db.execute(f"INSERT INTO scores ({COLUMNS}) VALUES (?, ?, ?, ?, ?)",
+                       (entry.difficulty, entry.score, entry.level, entry.created, entry.replay))
+            db.execute("DELETE FROM scores WHERE difficulty = ? AND id NOT IN "
+                       "(SELECT id FROM scores WHERE difficulty = ? ORDER BY score DESC, created LIMIT ?)",
+                       (entry.difficulty, entry.difficulty, self.top_n))
+
+    def fail(self, error):
+        self.error = error
+        print(f"Ошибка таблицы рекордов ({self.path}): {error}")
+
+
+def write_file(db, path, data): # noqa
+    """Пишет файл целиком или не пишет вовсе (через временный файл и os.replace)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temporary = path + ".tmp"
+    with open(temporary, 'wb') as f:
+        f.write(data)
+    os.replace(temporary, path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pacman.leaderboard", description="Печать таблицы рекордов")
+    parser.add_argument("file", help="файл таблицы (leaderboard.db в папке данных игры)")
+    args = parser.parse_args(argv)
+    if not os.path.exists(args.file):
+        parser.error(f"нет файла {args.file}")
+
+    board = Leaderboard(args.file)
+    board.loaded.wait()
+    board.close()
+    if board.error is not None:
+        return 1
+    for difficulty in sorted(board.entries):
+        print(f"Сложность {difficulty}:")
+        for rank, entry in enumerate(board.top(difficulty), 1):
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(entry.created))
+            print(f"  {rank:>2}. {entry.score:>7}  {when}  {entry.level}  {entry.replay or '-'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,263 @@
+"""Карты уровней: разбор текстового файла и компиляция в компактный индекс.
+
+Файл карты — строки сетки (1 — стена, 0 — монета, B — бонус, E — энерджайзер,
+P — портал, H — дом призраков) и директивы стартовых позиций:
+
+    player X Y
+    ghosts X Y X Y ...
+
+Строки, начинающиеся с '#', и пустые строки пропускаются. Скомпилированная карта
+(маски ходов, перекрёстки, порталы, дом, старты и таблицы MazeIndex) сохраняется
+рядом с исходником в файл <имя>.idx и при следующем запуске читается из него,
+если хэш содержимого карты не изменился.
+"""
+import hashlib
+import os
+import struct
+import sys
+from array import array
+
+from .maze import MazeIndex, LazyMazeIndex, DIRECTIONS
+
+# Папка карт: внутри .exe (PyInstaller) или рядом с пакетом
+BASE_DIR = getattr(sys, '_MEIPASS', os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MAPS_DIR = os.path.join(BASE_DIR, "assets", "maps")
+DEFAULT_MAP = os.path.join(MAPS_DIR, "classic.txt")
+
+TILES = "10BEPH"
+MAX_TABLE_NODES = 2048  # Больше проходимых клеток — таблицы для всех пар не строятся (LazyMazeIndex)
+WALL = ord('1')
+CACHE_MAGIC = b"PMMI"
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct("<4sBc32sII")  # магия, версия, порядок байт, sha256, строки, столбцы
+COUNT = struct.Struct("<I")
+
+
+class MapError(ValueError):
+    """Файл карты не удаётся разобрать"""
+
+
+class Level:
+    """Скомпилированная карта.
+
+    walkable[i] — 1, если клетка i = y * cols + x проходима;
+    moves[i] — битовая маска направлений (бит — код в DIRECTIONS), в которые можно шагнуть из i;
+    portal_exits[i] — (код направления, клетка выхода) для клеток-порталов на краю карты.
+    """
+    def __init__(self, name, digest, tiles, rows, cols, player_spawn, ghost_spawns): # noqa
+        self.name = name
+        self.spec = name  # Строка, по которой level_from_spec восстановит эту карту
+        self.digest = digest
+        self.tiles = tiles  # bytes: символ клетки, построчно
+        self.rows = rows
+        self.cols = cols
+        self.grid = [tiles[y * cols:(y + 1) * cols].decode("ascii") for y in range(rows)]
+        self.player_spawn = player_spawn
+        self.ghost_spawns = ghost_spawns
+        self.walkable = bytearray(tile != WALL for tile in tiles)
+        self.moves = bytearray(rows * cols)
+        self.intersections = array('i')
+        self.house = array('i')
+        self.portals = []  # Тройки (клетка, код направления, клетка выхода)
+        self.portal_exits = {}
+        self._index = None
+
+    def compile(self):
+        """Заполняет маски ходов, перекрёстки, дом и порталы по сетке"""
+        rows, cols, walkable, tiles = self.rows, self.cols, self.walkable, self.tiles
+        for y in range(rows):
+            for x in range(cols):
+                i = y * cols + x
+                if not walkable[i]:
+                    continue
+                mask = 0
+                for code, (dx, dy) in enumerate(DIRECTIONS):
+                    nx, ny = x + dx, y + dy
+                    if 0 <= nx < cols and 0 <= ny < rows:
+                        if walkable[ny * cols + nx]:
+                            mask |= 1 << code
+                    elif tiles[i] == ord('P') and walkable[ny % rows * cols + nx % cols]:
+                        # Портал ведёт на противоположный край карты
+                        self.portals.append((i, code, ny % rows * cols + nx % cols))
+                self.moves[i] = mask
+                if bin(mask).count("1") >= 3:
+                    self.intersections.append(i)
+                if tiles[i] == ord('H'):
+                    self.house.append(i)
+        self._link_portals()
+
+    def _link_portals(self):
+        self.portal_exits = {}
+        for cell, code, exit_cell in self.portals:
+            self.portal_exits.setdefault(cell, (code, exit_cell))
+
+    @property
+    def index(self):
+        """Кратчайшие пути: таблицы для всех пар (строятся при первом обращении или читаются
+        из кэша), а на больших картах — поля до отдельных целей по запросу"""
+        if self._index is None:
+            if sum(self.walkable) <= MAX_TABLE_NODES:
+                self._index = MazeIndex(self)
+            else:
+                self._index = LazyMazeIndex(self)
+        return self._index
+
+    # --- КЭШ НА ДИСКЕ ---
+    def to_bytes(self):
+        index = self.index
+        if isinstance(index, LazyMazeIndex):
+            tables = (array('H'), bytearray())  # Поля больших карт строятся по ходу игры
+        else:
+            tables = (index.dist, index.next_hop)
+        out = bytearray(CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, sys.byteorder[0].encode(),
+                                          self.digest, self.rows, self.cols))
+        out += self.tiles
+        out += self.moves
+        spawns = array('i', [*self.player_spawn, *(c for spawn in self.ghost_spawns for c in spawn)])
+        portals = array('i', [c for portal in self.portals for c in portal])
+        for part in (self.intersections, self.house, portals, spawns, *tables):
+            out += COUNT.pack(len(part))
+            out += part if isinstance(part, bytearray) else part.tobytes()
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data, name, digest):
+        """Читает кэш; None, если он от другой версии, машины или другого содержимого карты"""
+        if len(data) < CACHE_HEADER.size:
+            return None
+        magic, version, byteorder, cached_digest, rows, cols = CACHE_HEADER.unpack_from(data)
+        if (magic, version, byteorder, cached_digest) != (CACHE_MAGIC, CACHE_VERSION,
+                                                          sys.byteorder[0].encode(), digest):
+            return None
+        pos = CACHE_HEADER.size
+        cells = rows * cols
+        tiles = data[pos:pos + cells]
+        moves = data[pos + cells:pos + 2 * cells]
+        pos += 2 * cells
+
+        parts = []
+        for typecode in ('i', 'i', 'i', 'i', 'H', 'B'):
+            (count,), pos = COUNT.unpack_from(data, pos), pos + COUNT.size
+            part = array(typecode)
+            part.frombytes(data[pos:pos + count * part.itemsize])
+            pos += count * part.itemsize
+            parts.append(part)
+        intersections, house, portals, spawns, dist, next_hop = parts
+        if pos != len(data) or len(dist) != len(next_hop):
+            return None
+
+        ghost_spawns = [(spawns[k], spawns[k + 1]) for k in range(2, len(spawns), 2)]
+        level = cls(name, digest, bytes(tiles), rows, cols, (spawns[0], spawns[1]), ghost_spawns)
+        level.moves = bytearray(moves)
+        level.intersections = intersections
+        level.house = house
+        level.portals = [tuple(portals[k:k + 3]) for k in range(0, len(portals), 3)]
+        level._link_portals()
+        if dist:
+            level._index = MazeIndex(level, (dist, bytearray(next_hop)))
+        return level
+
+
+def parse_map(text, name="map"):
+    """Разбирает текст карты и возвращает некомпилированный Level"""
+    grid, player_spawn, ghost_spawns = [], None, []
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        word, *values = line.split()
+        if word in ("player", "ghosts"):
+            try:
+                coords = [int(v) for v in values]
+            except ValueError:
+                raise MapError(f"{name}:{number}: координаты должны быть целыми числами")
+            if not coords or len(coords) % 2:
+                raise MapError(f"{name}:{number}: ожидаются пары X Y")
+            points = list(zip(coords[::2], coords[1::2]))
+            if word == "player":
+                player_spawn = points[0]
+            else:
+                ghost_spawns = points
+            continue
+        bad = set(line) - set(TILES)
+        if bad:
+            raise MapError(f"{name}:{number}: неизвестные клетки {''.join(sorted(bad))!r}")
+        if grid and len(line) != len(grid[0]):
+            raise MapError(f"{name}:{number}: строка длиной {len(line)}, ожидалось {len(grid[0])}")
+        grid.append(line)
+
+    if not grid:
+        raise MapError(f"{name}: в карте нет ни одной строки")
+    if player_spawn is None or not ghost_spawns:
+        raise MapError(f"{name}: не заданы стартовые позиции (player и ghosts)")
+    rows, cols = len(grid), len(grid[0])
+    for x, y in [player_spawn, *ghost_spawns]:
+        if not (0 <= x < cols and 0 <= y < rows) or grid[y][x] == '1':
+            raise MapError(f"{name}: стартовая позиция ({x}, {y}) вне карты или в стене")
+
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+    return Level(name, digest, "".join(grid).encode("ascii"), rows, cols, player_spawn, ghost_spawns)
+
+
+def compile_map(text, name="map"):
+    level = parse_map(text, name)
+    level.compile()
+    return level
+
+
+def cache_path(path):
+    return os.path.splitext(path)[0] + ".idx"
+
+
+def load_level(path=DEFAULT_MAP, use_cache=True):
+    """Загружает карту из файла, по возможности из кэша рядом с ним"""
+    with open(path, 'rb') as f:
+        source = f.read()
+    text = source.decode("utf-8")
+    name = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha256(text.encode("utf-8")).digest()
+
+    if use_cache:
+        try:
+            with open(cache_path(path), 'rb') as f:
+                level = Level.from_bytes(f.read(), name, digest)
+            if level is not None:
+                return level
+        except (OSError, ValueError, struct.error):
+            pass  # Кэша нет или он испорчен — компилируем заново
+
+    level = compile_map(text, name)
+    if use_cache:
+        try:
+            with open(cache_path(path), 'wb') as f:
+                f.write(level.to_bytes())
+        except OSError:
+            pass  # Папка только для чтения — работаем без кэша
+    return level
+
+
+def level_from_spec(spec):
+    """Карта по строке: "classic" или "" — стандартная, "gen:ШxВ:зерно" — сгенерированная,
+    иначе имя карты из assets/maps или путь к файлу"""
+    if not spec or spec == "classic":
+        return LEVEL
+    if spec.startswith("gen:"):
+        from .mazegen import generate_level
+        try:
+            _, size, seed = spec.split(":")
+            cols, rows = (int(v) for v in size.lower().split("x"))
+            seed = int(seed)
+        except ValueError:
+            raise MapError(f"ожидалось gen:ШИРИНАxВЫСОТА:ЗЕРНО, получено {spec!r}")
+        level = generate_level(cols, rows, seed)
+    else:
+        path = spec
+        if not os.path.exists(path):
+            path = os.path.join(MAPS_DIR, spec + ".txt")
+        level = load_level(path)
+    level.spec = spec
+    return level
+
+
+LEVEL = load_level()
+LEVEL.spec = "classic"
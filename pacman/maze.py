@@ -0,0 +1,218 @@
+"""Индекс лабиринта: кратчайшие расстояния и первый шаг пути для всех пар клеток.
+
+Индекс строится один раз по карте (BFS из каждой проходимой клетки, порталы
+учитываются как соседние клетки), после чего выбор направления призраком —
+это несколько обращений к массиву вместо пересчёта расстояний.
+Готовые таблицы хранятся в кэше скомпилированной карты (см. level.py).
+"""
+from array import array
+from collections import deque, OrderedDict
+
+# Направления — кортежи (dx, dy); индекс в DIRECTIONS — код направления
+STOP = (0, 0)
+LEFT = (-1, 0)
+RIGHT = (1, 0)
+UP = (0, -1)
+DOWN = (0, 1)
+DIRECTIONS = [RIGHT, LEFT, DOWN, UP]
+DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+NO_DIRECTION = 255
+UNREACHABLE = 0xFFFF
+
+# Персонажи хранят направление кодом; STOP_CODE — «стоит на месте» (в таблицах индекса это NO_DIRECTION).
+# Маски ходов занимают младшие четыре бита, поэтому moves >> STOP_CODE & 1 всегда 0
+STOP_CODE = 4
+VECTORS = (*DIRECTIONS, STOP)  # Код -> (dx, dy)
+DX = tuple(dx for dx, _ in VECTORS)
+DY = tuple(dy for _, dy in VECTORS)
+CODES = {direction: code for code, direction in enumerate(VECTORS)}
+OPPOSITE = (1, 0, 3, 2, STOP_CODE)
+MASK_CODES = tuple(tuple(code for code in range(4) if mask >> code & 1) for mask in range(16))  # Маска -> коды
+
+
+class MazeIndex:
+    """Расстояния и направления первого шага для каждой пары (клетка, цель).
+
+    dist[src * n + dst] — длина кратчайшего пути в клетках (UNREACHABLE, если пути нет),
+    next_hop[src * n + dst] — код направления первого шага из src к dst.
+    level — скомпилированная карта (level.Level), tables — готовые (dist, next_hop) из кэша.
+    """
+    def __init__(self, level, tables=None): # noqa
+        self._build_graph(level)
+        n = self.size
+        self.fields = {}  # Кэш полей направлений: номер цели -> bytearray по клеткам сетки
+
+        if tables is not None and len(tables[0]) == n * n:
+            self.dist, self.next_hop = tables
+            return
+        self.dist = array('H', [UNREACHABLE]) * (n * n)
+        self.next_hop = bytearray([NO_DIRECTION]) * (n * n)
+        for target in range(n):
+            self._bfs(target)
+
+    def _build_graph(self, level):
+        """Номера проходимых клеток, списки соседей и ближайшая проходимая клетка для каждой клетки"""
+        self.rows = level.rows
+        self.cols = level.cols
+
+        # Проходимые клетки получают номера 0..n-1, стены — -1
+        self.node = array('i', [-1]) * (self.rows * self.cols)
+        self.cells = []
+        for i, walkable in enumerate(level.walkable):
+            if walkable:
+                self.node[i] = len(self.cells)
+                self.cells.append((i % self.cols, i // self.cols))
+        self.size = len(self.cells)
+
+        portals = {(cell, code): exit_cell for cell, code, exit_cell in level.portals}
+        self.neighbours = [self._neighbours(y * self.cols + x, level.moves, portals) for x, y in self.cells]
+        self.nearest = self._nearest_nodes()
+
+    def _neighbours(self, cell, moves, portals):
+        """Пары (код направления, номер клетки) для соседей клетки, включая порталы"""
+        result = []
+        for code, (dx, dy) in enumerate(DIRECTIONS):
+            if moves[cell] >> code & 1:
+                nb = self.node[cell + dy * self.cols + dx]
+            elif (cell, code) in portals:
+                # Портал на краю карты ведёт на противоположный край
+                nb = self.node[portals[cell, code]]
+            else:
+                continue
+            result.append((code, nb))
+        return result
+
+    def _nearest_nodes(self):
+        """Для каждой клетки сетки — ближайшая проходимая клетка (многоисточниковый BFS)"""
+        nearest = array('i', [-1]) * (self.rows * self.cols)
+        queue = deque()
+        for i, (x, y) in enumerate(self.cells):
+            nearest[y * self.cols + x] = i
+            queue.append((x, y))
+        while queue:
+            x, y = queue.popleft()
+            source = nearest[y * self.cols + x]
+            for dx, dy in DIRECTIONS:
+                nx, ny = x + dx, y + dy
+                if 0 <= nx < self.cols and 0 <= ny < self.rows and nearest[ny * self.cols + nx] < 0:
+                    nearest[ny * self.cols + nx] = source
+                    queue.append((nx, ny))
+        return nearest
+
+    def _bfs(self, target):
+        """Заполняет столбец target: расстояния до цели и первый шаг к ней"""
+        n = self.size
+        dist, next_hop, neighbours = self.dist, self.next_hop, self.neighbours
+        dist[target * n + target] = 0
+        queue = deque([target])
+        while queue:
+            current = queue.popleft()
+            d = dist[current * n + target] + 1
+            for code, nb in neighbours[current]:
+                if dist[nb * n + target] == UNREACHABLE:
+                    dist[nb * n + target] = d
+                    # Из соседа идём обратно к текущей клетке
+                    next_hop[nb * n + target] = OPPOSITE[code]
+                    queue.append(nb)
+
+    def node_at(self, x, y):
+        """Номер проходимой клетки, ближайшей к (x, y); координаты вне карты прижимаются к краю"""
+        x = min(max(int(x), 0), self.cols - 1)
+        y = min(max(int(y), 0), self.rows - 1)
+        return self.nearest[y * self.cols + x]
+
+    def distance(self, src, dst):
+        """Длина кратчайшего пути между клетками src и dst (кортежи (x, y))"""
+        return self.distance_xy(*src, *dst)
+
+    def next_direction(self, src, dst):
+        """Направление первого шага по кратчайшему пути из src в dst (STOP, если уже на месте)"""
+        code = self.next_code(*src, *dst)
+        return STOP if code == NO_DIRECTION else DIRECTIONS[code]
+
+    # Варианты для горячего пути призраков: координаты числами, без промежуточных кортежей
+    def distance_xy(self, x, y, tx, ty):
+        return self.dist[self.node_at(x, y) * self.size + self.node_at(tx, ty)]
+
+    def next_code(self, x, y, tx, ty):
+        """Код первого шага из (x, y) к (tx, ty); NO_DIRECTION, если уже на месте"""
+        return self.next_hop[self.node_at(x, y) * self.size + self.node_at(tx, ty)]
+
+    def flow_field(self, goal):
+        """Поле направлений к клетке goal: код первого шага для каждой клетки сетки (y * cols + x).
+
+        Строится один раз на цель и живёт вместе с индексом, то есть пересчитывается
+        только при смене карты. В стенах и в самой цели — NO_DIRECTION.
+        """
+        target = self.node_at(*goal)
+        field = self.fields.get(target)
+        if field is None:
+            field = bytearray([NO_DIRECTION]) * (self.rows * self.cols)
+            for i, (x, y) in enumerate(self.cells):
+                field[y * self.cols + x] = self.next_hop[i * self.size + target]
+            self.fields[target] = field
+        return field
+
+
+class BoundedField:
+    """Расстояния и первые шаги к одной цели для клеток не дальше radius шагов от неё"""
+    def __init__(self, neighbours, target, radius): # noqa
+        dist = self.dist = {target: 0}
+        hop = self.hop = {}
+        frontier = [target]
+        for d in range(1, radius + 1):
+            next_frontier = []
+            for current in frontier:
+                for code, nb in neighbours[current]:
+                    if nb not in dist:
+                        dist[nb] = d
+                        hop[nb] = OPPOSITE[code]
+                        next_frontier.append(nb)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+
+
+class LazyMazeIndex(MazeIndex):
+    """Индекс для больших карт, где таблицы для всех пар не помещаются в память.
+
+    Для произвольной цели считается только окрестность радиусом radius шагов
+    (последние max_fields окрестностей хранятся, LRU), поэтому цена запроса зависит
+    от радиуса, а не от размера карты. Дальше радиуса расстояние — UNREACHABLE,
+    а направление — STOP: призрак идёт к цели по прямой, пока не подойдёт ближе.
+    Полные поля (flow_field) строятся только для постоянных целей, например дома.
+    """
+    def __init__(self, level, radius=24, max_fields=256): # noqa
+        self._build_graph(level)
+        self.radius = radius
+        self.max_fields = max_fields
+        self.fields = {}
+        self.local = OrderedDict()
+
+    def local_field(self, target):
+        field = self.local.get(target)
+        if field is None:
+            field = self.local[target] = BoundedField(self.neighbours, target, self.radius)
+            if len(self.local) > self.max_fields:
+                self.local.popitem(last=False)
+        else:
+            self.local.move_to_end(target)
+        return field
+
+    def distance_xy(self, x, y, tx, ty):
+        return self.local_field(self.node_at(tx, ty)).dist.get(self.node_at(x, y), UNREACHABLE)
+
+    def next_code(self, x, y, tx, ty):
+        return self.local_field(self.node_at(tx, ty)).hop.get(self.node_at(x, y), NO_DIRECTION)
+
+    def flow_field(self, goal):
+        target = self.node_at(*goal)
+        field = self.fields.get(target)
+        if field is None:
+            full = BoundedField(self.neighbours, target, self.size)
+            field = bytearray([NO_DIRECTION]) * (self.rows * self.cols)
+            for node, code in full.hop.items():
+                x, y = self.cells[node]
+                field[y * self.cols + x] = code
+            self.fields[target] = field
+        return field
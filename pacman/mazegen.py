@@ -0,0 +1,94 @@
+"""Генератор больших лабиринтов в формате карт level.py.
+
+Коридоры прокладываются обходом в глубину по клеткам с нечётными координатами,
+затем тупики разбиваются (как в Pac-Man, в лабиринте нет тупиков), в центре
+вырезается дом призраков, на краях ставятся порталы. Одинаковые размер
+и зерно дают одинаковую карту.
+"""
+import random
+
+from .level import compile_map
+
+MIN_SIZE = 11
+
+
+def generate_grid(cols, rows, seed=0):
+    """Сетка карты (список строк) и стартовые позиции: (grid, player, ghosts)"""
+    if cols < MIN_SIZE or rows < MIN_SIZE:
+        raise ValueError(f"лабиринт должен быть не меньше {MIN_SIZE}x{MIN_SIZE}")
+    rng = random.Random(seed)
+    # Комнаты стоят на нечётных координатах, поэтому последняя строка и столбец — стены
+    inner_cols = cols - 1 if cols % 2 == 0 else cols
+    inner_rows = rows - 1 if rows % 2 == 0 else rows
+    grid = [bytearray(b'1') * cols for _ in range(rows)]
+
+    # Обход в глубину
+    steps = [(2, 0), (-2, 0), (0, 2), (0, -2)]
+    grid[1][1] = ord('0')
+    stack = [(1, 1)]
+    while stack:
+        x, y = stack[-1]
+        options = [(dx, dy) for dx, dy in steps
+                   if 0 < x + dx < inner_cols - 1 and 0 < y + dy < inner_rows - 1
+                   and grid[y + dy][x + dx] == ord('1')]
+        if not options:
+            stack.pop()
+            continue
+        dx, dy = rng.choice(options)
+        grid[y + dy // 2][x + dx // 2] = ord('0')
+        grid[y + dy][x + dx] = ord('0')
+        stack.append((x + dx, y + dy))
+
+    # Разбиваем тупики: из каждой комнаты с одним выходом пробиваем ещё один
+    for y in range(1, inner_rows - 1, 2):
+        for x in range(1, inner_cols - 1, 2):
+            exits = [(dx, dy) for dx, dy in steps if grid[y + dy // 2][x + dx // 2] != ord('1')]
+            if len(exits) == 1:
+                walls = [(dx, dy) for dx, dy in steps
+                         if 0 < x + dx < inner_cols - 1 and 0 < y + dy < inner_rows - 1
+                         and grid[y + dy // 2][x + dx // 2] == ord('1')]
+                if walls:
+                    dx, dy = rng.choice(walls)
+                    grid[y + dy // 2][x + dx // 2] = ord('0')
+
+    # Дом призраков в центре: прямоугольник 4x2, открытый в окружающие коридоры
+    hx = (cols // 2 - 2) | 1
+    hy = (rows // 2) | 1
+    ghosts = []
+    for y in range(hy, hy + 2):
+        for x in range(hx, hx + 4):
+            grid[y][x] = ord('H')
+            ghosts.append((x, y))
+    ghosts = [ghosts[1], ghosts[5], ghosts[6], ghosts[2]]
+
+    # Энерджайзеры в углах и редкие бонусы
+    corners = [(1, 1), (inner_cols - 2, 1), (1, inner_rows - 2), (inner_cols - 2, inner_rows - 2)]
+    for x, y in corners[1:]:
+        grid[y][x] = ord('E')
+    for y in range(1, rows - 1):
+        for x in range(1, cols - 1):
+            if grid[y][x] == ord('0') and rng.random() < 0.003:
+                grid[y][x] = ord('B')
+
+    # Порталы на левом и правом краях на четвертях высоты (строки комнат, вне дома)
+    for y in sorted({rows * k // 4 | 1 for k in (1, 2, 3)} - {hy}):
+        if y < inner_rows - 1:
+            grid[y][0] = ord('P')
+            for x in range(inner_cols - 1, cols):
+                grid[y][x] = ord('0')
+            grid[y][cols - 1] = ord('P')
+
+    return [row.decode("ascii") for row in grid], (1, 1), ghosts
+
+
+def generate_text(cols, rows, seed=0):
+    """Текст карты в формате файлов assets/maps"""
+    grid, player, ghosts = generate_grid(cols, rows, seed)
+    lines = [f"# Сгенерированный лабиринт {cols}x{rows}, зерно {seed}",
+             f"player {player[0]} {player[1]}",
+             "ghosts " + "  ".join(f"{x} {y}" for x, y in ghosts)]
+    return "\n".join(lines + grid) + "\n"
+
+
+def generate_level(cols, rows, seed=0):
+    return compile_map(generate_text(cols, rows, seed), f"gen:{cols}x{rows}:{seed}")
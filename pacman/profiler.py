@@ -0,0 +1,89 @@
+"""Профилировщик кадра: время каждой фазы главного цикла.
+
+Фаза отмечается вызовом mark(name) в её конце: время с предыдущей отметки
+прибавляется к фазе name текущего кадра. Отметки — это perf_counter и запись
+в словарь, поэтому профилировщик можно держать включённым постоянно.
+Модуль не зависит от pygame.
+"""
+import csv
+import json
+import math
+import time
+from collections import deque
+
+WINDOW = 300  # Кадров в скользящем окне процентилей
+TRACE_LIMIT = 100_000  # Кадров в трассе для выгрузки (старые отбрасываются)
+PERCENTILES = (50, 95, 99)
+
+
+def percentile(sorted_values, p):
+    """p-й процентиль уже отсортированного списка (ближайший ранг)"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[max(0, math.ceil(p / 100 * len(sorted_values)) - 1)]
+
+
+class FrameProfiler:
+    """Время фаз по кадрам: скользящее окно для наложения и трасса для выгрузки"""
+    def __init__(self, window=WINDOW, trace_limit=TRACE_LIMIT): # noqa
+        self.phases = []  # Имена фаз в порядке первого появления
+        self.current = {}
+        self.history = {}  # Фаза -> deque длительностей в секундах за последние window кадров
+        self.totals = deque(maxlen=window)
+        self.trace = deque(maxlen=trace_limit)  # (номер кадра, длительность, {фаза: секунды})
+        self.window = window
+        self.frame = 0
+        self.frame_start = self.last = time.perf_counter()
+
+    def start_frame(self):
+        self.current = {}
+        self.frame_start = self.last = time.perf_counter()
+
+    def mark(self, name):
+        """Закрывает фазу name: время с прошлой отметки идёт в неё"""
+        now = time.perf_counter()
+        self.current[name] = self.current.get(name, 0.0) + now - self.last
+        self.last = now
+
+    def end_frame(self):
+        total = self.last - self.frame_start
+        current = self.current
+        for name, seconds in current.items():
+            history = self.history.get(name)
+            if history is None:
+                self.phases.append(name)
+                history = self.history[name] = deque(maxlen=self.window)
+            history.append(seconds)
+        # Фазы, которых в кадре не было, получают ноль, чтобы окна шли в ногу
+        for name in self.phases:
+            if name not in current:
+                self.history[name].append(0.0)
+        self.totals.append(total)
+        self.trace.append((self.frame, total, current))
+        self.frame += 1
+
+    def summary(self):
+        """{фаза: (p50, p95, p99)} в миллисекундах по скользящему окну, плюс "frame" — кадр целиком"""
+        result = {}
+        for name, values in [*((n, self.history[n]) for n in self.phases), ("frame", self.totals)]:
+            ordered = sorted(values)
+            result[name] = tuple(percentile(ordered, p) * 1000 for p in PERCENTILES)
+        return result
+
+    def export(self, path):
+        """Пишет трассу в CSV или JSON (по расширению файла), времена в миллисекундах"""
+        if path.lower().endswith(".json"):
+            frames = [{"frame": frame, "total_ms": total * 1000,
+                       "phases": {name: seconds * 1000 for name, seconds in phases.items()}}
+                      for frame, total, phases in self.trace]
+            summary = {name: dict(zip((f"p{p}" for p in PERCENTILES), values))
+                       for name, values in self.summary().items()}
+            with open(path, 'w') as f:
+                json.dump({"phases": self.phases, "summary": summary, "frames": frames}, f)
+        else:
+            with open(path, 'w', newline='') as f:
+                writer = csv.writer(f)
+                writer.writerow(["frame", "total_ms", *self.phases])
+                for frame, total, phases in self.trace:
+                    writer.writerow([frame, f"{total * 1000:.4f}",
+                                     *(f"{phases.get(name, 0.0) * 1000:.4f}" for name in self.phases)])
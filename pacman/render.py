@@ -0,0 +1,634 @@
+"""Отрисовка состояния партии на поверхность pygame"""
+import math
+from collections import OrderedDict
+
+import pygame
+
+from .settings import TILE_SIZE, WIDTH, HEIGHT, BLACK, BLUE, YELLOW, WHITE, GOLD, CYAN, PINK, GREEN
+from .maze import STOP, DIRECTIONS
+from .engine import COIN, BONUS, ENERGIZER
+
+
+class MazeLayer:
+    """Статичный слой стен: рисуется один раз и перерисовывается только при смене карты или размера"""
+    def __init__(self): # noqa
+        self.surface = None
+        self.grid = None
+        self.size = None
+
+    def invalidate(self):
+        self.surface = None
+
+    def get(self, grid, size):
+        if self.surface is None or grid is not self.grid or size != self.size:
+            self.grid = grid
+            self.size = size
+            self.surface = self.render(grid, size)
+        return self.surface
+
+    @staticmethod
+    def render(grid, size):
+        layer = pygame.Surface(size)
+        layer.fill(BLACK)
+        for y, row in enumerate(grid):
+            for x, tile in enumerate(row):
+                if tile == '1':
+                    pygame.draw.rect(layer, BLUE,
+                                     (x * TILE_SIZE, y * TILE_SIZE, TILE_SIZE, TILE_SIZE),
+                                     border_radius=3)
+        # Формат экрана ускоряет blit, но доступен только при открытом окне
+        if pygame.display.get_surface() is not None:
+            layer = layer.convert()
+        return layer
+
+
+maze_layer = MazeLayer()
+
+
+class TextCache:
+    """Готовые надписи по ключу (шрифт, строка, цвет) с вытеснением давно не использованных.
+
+    Текст растеризуется заново только когда меняется его содержимое.
+    """
+    def __init__(self, max_size=128): # noqa
+        self.max_size = max_size
+        self.entries = OrderedDict()
+
+    def clear(self):
+        self.entries.clear()
+
+    def render(self, font, text, color):
+        key = (font, text, color)
+        surface = self.entries.get(key)
+        if surface is None:
+            surface = self.entries[key] = font.render(text, True, color)
+            if len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+        else:
+            self.entries.move_to_end(key)
+        return surface
+
+
+text_cache = TextCache()
+
+
+WAVE_PHASES = 32  # Число заранее нарисованных фаз волны призрака
+GHOST_SPRITE_HEIGHT = TILE_SIZE + 6  # Волна опускается ниже клетки
+
+
+def render_player_frame(direction, mouth_angle, radius):
+    """Кадр Пакмана на прозрачной поверхности размером в клетку"""
+    frame = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
+    center = (TILE_SIZE // 2, TILE_SIZE // 2)
+
+    # 1. Рисуем основное тело (жёлтый круг)
+    pygame.draw.circle(frame, YELLOW, center, radius)
+
+    # 2. Определяем углы рта для разных направлений
+    dx, dy = direction
+    if dx > 0:  # Вправо
+        mouth_width = math.radians(30 + mouth_angle)
+        angle = 0  # 0° - горизонтально вправо
+    elif dx < 0:  # Влево
+        mouth_width = math.radians(30 + mouth_angle)
+        angle = math.pi  # 180° - горизонтально влево
+    elif dy > 0:  # Вниз
+        mouth_width = math.radians(30 + mouth_angle)
+        angle = math.pi / 2  # 90° - вертикально вниз
+    elif dy < 0:  # Вверх
+        mouth_width = math.radians(30 + mouth_angle)
+        angle = 3 * math.pi / 2  # 270° - вертикально вверх
+    else:  # Стоит
+        mouth_width = math.radians(30)
+        angle = 0
+
+    # 3. Рассчитываем точки рта
+    start_angle = angle - mouth_width / 2
+    end_angle = angle + mouth_width / 2
+
+    # 4. Рисуем рот (чёрный треугольник)
+    points = [center]
+    steps = 20
+    for i in range(steps + 1):
+        angle = start_angle + (end_angle - start_angle) * i / steps
+        points.append((
+            center[0] + radius * math.cos(angle),
+            center[1] + radius * math.sin(angle)
+        ))
+    pygame.draw.polygon(frame, BLACK, points)
+    return frame
+
+
+def render_ghost_frame(color, phase, direction, eaten):
+    """Кадр призрака: тело с волной заданной фазы и глаза, смотрящие по направлению"""
+    frame = pygame.Surface((TILE_SIZE, GHOST_SPRITE_HEIGHT), pygame.SRCALPHA)
+    dx, dy = direction
+    size = TILE_SIZE - 4
+    center_x = center_y = TILE_SIZE // 2
+
+    if not eaten:
+        # 1. Верхний полукруг (голова)
+        head_height = size // 2  # Половина высоты для головы
+        pygame.draw.ellipse(frame, color, [2, 2, size, head_height])
+
+        # 2. Основное тело - начинаем ниже головы
+        body_top = 2 + head_height - 3  # Поднимаем на 3 пикселя
+        body_height = size // 2 + 3  # Компенсируем поднятие
+        pygame.draw.rect(frame, color, pygame.Rect(2, body_top, size, body_height))
+
+        # 3. Волнистая часть - начинаем строго от низа тела
+        wave_height = 5
+        steps = 6
+        wave_offset = phase * 2 * math.pi / WAVE_PHASES
+
+        # Стартовая точка (левый край тела)
+        points = [(2, body_top + body_height)]
+
+        # Волны
+        for i in range(1, steps):
+            px = 2 + i * size // (steps - 1)
+            wave = wave_height * math.sin(wave_offset + i)
+            points.append((px, (body_top + body_height) - wave))
+
+        # Финишная точка (правый край тела)
+        points.append((2 + size, body_top + body_height))
+        pygame.draw.polygon(frame, color, points)
+
+    # 4. Глаза (у съеденного призрака остаются только они)
+    eye_size = TILE_SIZE // 6 if eaten else size // 6
+    left_eye = (center_x - 6, center_y - 4)
+    right_eye = (center_x + 6, center_y - 4)
+
+    pygame.draw.circle(frame, WHITE, left_eye, eye_size)
+    pygame.draw.circle(frame, WHITE, right_eye, eye_size)
+
+    # Зрачки с учетом направления движения
+    pupil_offset = 2
+    pygame.draw.circle(frame, BLACK,
+                       (left_eye[0] + dx * pupil_offset, left_eye[1] + dy * pupil_offset),
+                       eye_size // 2)
+    pygame.draw.circle(frame, BLACK,
+                       (right_eye[0] + dx * pupil_offset, right_eye[1] + dy * pupil_offset),
+                       eye_size // 2)
+    return frame
+
+
+class SpriteCache:
+    """Атлас заранее нарисованных кадров Пакмана и призраков.
+
+    Кадр Пакмана — по (направление, угол рта, радиус), кадр призрака —
+    по (цвет, фаза волны, направление зрачков, съеден ли). Отрисовка персонажа
+    сводится к поиску в словаре и одному blit.
+    """
+    def __init__(self): # noqa
+        self.player_frames = {}
+        self.ghost_frames = {}
+
+    def clear(self):
+        self.player_frames.clear()
+        self.ghost_frames.clear()
+
+    def prebuild(self, ghost_colors):
+        """Рисует все кадры обычного движения заранее, чтобы не тормозить первые секунды игры"""
+        radius = TILE_SIZE // 2 - 2
+        for direction in [STOP, *DIRECTIONS]:
+            for mouth_angle in range(0, 51, 5):
+                self.player_frame(direction, mouth_angle, radius)
+            self.ghost_frame(WHITE, 0, direction, True)
+            for color in ghost_colors:
+                for phase in range(WAVE_PHASES):
+                    self.ghost_frame(color, phase, direction, False)
+
+    @staticmethod
+    def _prepare(frame):
+        # Формат экрана ускоряет blit, но доступен только при открытом окне
+        if pygame.display.get_surface() is not None:
+            return frame.convert_alpha()
+        return frame
+
+    def player_frame(self, direction, mouth_angle, radius):
+        key = (direction, mouth_angle, radius)
+        frame = self.player_frames.get(key)
+        if frame is None:
+            frame = self.player_frames[key] = self._prepare(render_player_frame(direction, mouth_angle, radius))
+        return frame
+
+    def ghost_frame(self, color, phase, direction, eaten):
+        key = (color, phase, direction, eaten)
+        frame = self.ghost_frames.get(key)
+        if frame is None:
+            frame = self.ghost_frames[key] = self._prepare(render_ghost_frame(color, phase, direction, eaten))
+        return frame
+
+
+sprites = SpriteCache()
+
+
+def draw_player(surface, player, pos=None):
+    """pos — точка отрисовки (по умолчанию текущая позиция игрока)"""
+    radius = TILE_SIZE // 2 - 2
+
+    if not player.is_alive:
+        # Анимация смерти - уменьшающийся круг
+        current_frame = min(player.death_frame, player.death_animation_frames)
+        progress = current_frame / player.death_animation_frames
+        radius = int((TILE_SIZE // 2 - 2) * (1 - progress))
+
+    # Логика мигания при иммунитете
+    if player.immune_timer > 0 and (player.immune_timer // 10) % 2 != 0:
+        # Мигаем каждые 10 кадров (при 60 FPS - 6 раз в секунду)
+        return  # Пропускаем отрисовку в этом кадре
+
+    # Угол рта важен только в движении
+    mouth_angle = player.mouth_angle if player.direction != STOP else 0
+    frame = sprites.player_frame(player.direction, mouth_angle, radius)
+    surface.blit(frame, pos or (int(player.pix_x), int(player.pix_y)))
+
+
+def ghost_sprite(ghost):
+    if ghost.state == "eaten":
+        # Если призрак съеден - рисуем только глаза
+        return sprites.ghost_frame(WHITE, 0, ghost.direction, True)
+    # Цвет призрака в зависимости от состояния
+    color = ghost.frightened_color if ghost.state == "frightened" else ghost.color
+    phase = int(ghost.wave_offset * WAVE_PHASES / (2 * math.pi)) % WAVE_PHASES
+    return sprites.ghost_frame(color, phase, ghost.direction, False)
+
+
+def draw_ghost(surface, ghost, pos=None):
+    surface.blit(ghost_sprite(ghost), pos or (int(ghost.pix_x), int(ghost.pix_y)))
+
+
+def draw_ghosts(surface, ghosts, positions, ox=0, oy=0):
+    """Все призраки одним вызовом blits; (ox, oy) — сдвиг камеры в пикселях"""
+    surface.blits([(ghost_sprite(ghost), (x - ox, y - oy)) for ghost, (x, y) in zip(ghosts, positions)],
+                  doreturn=False)
+
+
+def draw_pellet(surface, x, y, kind, tick, ox=0, oy=0):
+    """Монета, бонус или энерджайзер в клетке (x, y); (ox, oy) — сдвиг камеры в пикселях"""
+    center = (x * TILE_SIZE + TILE_SIZE // 2 - ox, y * TILE_SIZE + TILE_SIZE // 2 - oy)
+    if kind == COIN:
+        pygame.draw.circle(surface, GOLD, center, 3)
+    elif kind == ENERGIZER:
+        # Энерджайзеры не мигают и обведены белым
+        pygame.draw.circle(surface, PINK, center, 10)
+        pygame.draw.circle(surface, WHITE, center, 10, 2)
+    elif tick % 30 < 15:  # Обычные бонусы мигают
+        pygame.draw.circle(surface, GREEN, center, 6)
+
+
+def draw_pellets(surface, pellets, tick):
+    cols = pellets.cols
+    for i, kind in enumerate(pellets.cells):
+        if kind:
+            draw_pellet(surface, i % cols, i // cols, kind, tick)
+
+
+def draw_hud(surface, state, high_score, font):
+    pygame.draw.rect(surface, BLACK, (0, HEIGHT - 40, WIDTH, 40))
+    # Счет
+    score_text = text_cache.render(font, f"Score: {state.score}", WHITE)
+    surface.blit(score_text, (10, HEIGHT - 30))
+    # Рекорд
+    high_text = text_cache.render(font, f"Record: {high_score}", YELLOW)
+    surface.blit(high_text, (WIDTH // 2 - high_text.get_width() // 2, HEIGHT - 55))
+    # Жизни
+    lives_text = text_cache.render(font, f"Lives: {state.lives}", WHITE)
+    surface.blit(lives_text, (WIDTH - 120, HEIGHT - 30))
+
+    # Таймер иммунитета
+    if state.player.immune_timer > 0:
+        immune_text = text_cache.render(font, f"Immune: {state.player.immune_timer // 60 + 1}s", CYAN)
+        surface.blit(immune_text, (WIDTH // 2 - immune_text.get_width() // 2, HEIGHT - 30))
+
+
+def draw_game(surface, state, high_score, font, positions=None, timer=None):
+    """Полный кадр игрового процесса: стены, монеты, бонусы, персонажи и HUD.
+
+    positions — точки отрисовки игрока и призраков (см. interpolate_positions).
+    timer — необязательная отметка конца фазы (FrameProfiler.mark).
+    """
+    if positions is None:
+        positions = actor_positions(state)
+
+    # Фон и стены — один blit закэшированного слоя
+    surface.blit(maze_layer.get(state.level.grid, surface.get_size()), (0, 0))
+    if timer: timer("walls")
+
+    # Отрисовка монеток и бонусов
+    draw_pellets(surface, state.pellets, state.tick)
+    if timer: timer("pellets_draw")
+
+    # Отрисовка призраков
+    draw_ghosts(surface, state.ghosts, positions[1:])
+
+    # Отрисовка игрока
+    draw_player(surface, state.player, positions[0])
+    if timer: timer("sprites")
+
+    # Отрисовка UI
+    draw_hud(surface, state, high_score, font)
+    if timer: timer("hud")
+
+
+HUD_RECT = pygame.Rect(0, HEIGHT - 55, WIDTH, 55)
+VIEWPORT = pygame.Rect(0, 0, WIDTH, HUD_RECT.top)  # Область кадра под карту
+
+
+def actor_positions(state):
+    """Текущие пиксельные позиции игрока и призраков"""
+    return [(int(state.player.pix_x), int(state.player.pix_y))] + \
+           [(int(ghost.pix_x), int(ghost.pix_y)) for ghost in state.ghosts]
+
+
+def actor_pixels(state):
+    """Точные (дробные) позиции игрока и призраков — запоминаются перед тиком для интерполяции"""
+    return [(state.player.pix_x, state.player.pix_y)] + [(g.pix_x, g.pix_y) for g in state.ghosts]
+
+
+def interpolate_positions(state, previous, alpha):
+    """Позиции персонажей между двумя тиками симуляции.
+
+    previous — позиции (float) на прошлом тике, alpha — доля пройденного до
+    следующего тика времени. Скачки больше клетки (порталы, возрождение)
+    не интерполируются.
+    """
+    positions = []
+    for (x0, y0), (x1, y1) in zip(previous, actor_pixels(state)):
+        if abs(x1 - x0) > TILE_SIZE or abs(y1 - y0) > TILE_SIZE:
+            positions.append((int(x1), int(y1)))
+        else:
+            positions.append((int(x0 + (x1 - x0) * alpha), int(y0 + (y1 - y0) * alpha)))
+    return positions
+
+
+def actor_rects(positions):
+    """Области кадра, занятые персонажами"""
+    rects = [pygame.Rect(positions[0], (TILE_SIZE, TILE_SIZE))]
+    for pos in positions[1:]:
+        rects.append(pygame.Rect(pos, (TILE_SIZE, GHOST_SPRITE_HEIGHT)))
+    return rects
+
+
+MAX_DIRTY_RECTS = 128  # Больше грязных областей — кадр рисуется целиком
+
+
+class DirtyRenderer:
+    """Отрисовка игрового процесса с обновлением только изменившихся областей.
+
+    Грязными считаются старые и новые места персонажей, клетки съеденных монет,
+    клетки мигающих бонусов и HUD при смене текста. draw() возвращает список
+    перерисованных прямоугольников или None, если кадр нарисован целиком.
+    """
+    def __init__(self): # noqa
+        self.full = True
+        self.layer = None
+        self.actors = []
+        self.damaged = []
+        self.hud = None
+        self.blink = None
+
+    def invalidate(self):
+        """Следующий кадр рисуется целиком (смена экрана, окна или состояния)"""
+        self.full = True
+
+    def damage(self, rect):
+        """Область rect испорчена чужой отрисовкой и будет восстановлена в следующем кадре"""
+        self.damaged.append(pygame.Rect(rect))
+
+    def draw(self, surface, state, high_score, font, positions=None, timer=None):
+        layer = maze_layer.get(state.level.grid, surface.get_size())
+        pellets = state.pellets
+        if positions is None:
+            positions = actor_positions(state)
+        actors = actor_rects(positions)
+        immune = state.player.immune_timer // 60 + 1 if state.player.immune_timer > 0 else 0
+        hud = (state.score, high_score, state.lives, immune)
+        blink = state.tick % 30 < 15
+
+        if self.full or layer is not self.layer:
+            draw_game(surface, state, high_score, font, positions, timer)
+            self.full = False
+            self.damaged.clear()
+            self.layer, self.actors, self.hud, self.blink = layer, actors, hud, blink
+            pellets.taken.clear()
+            return None
+
+        # Старые и новые места персонажей и чужие испорченные области
+        dirty = self.actors + actors + self.damaged
+        self.actors = actors
+        self.damaged = []
+        if len(dirty) > MAX_DIRTY_RECTS:
+            # Рой призраков: один полный кадр дешевле тысяч мелких восстановлений
+            draw_game(surface, state, high_score, font, positions, timer)
+            self.hud, self.blink = hud, blink
+            pellets.taken.clear()
+            return None
+
+        # Съеденные монеты и мигающие бонусы
+        cols = pellets.cols
+        tiles = pellets.taken
+        if blink != self.blink:
+            self.blink = blink
+            start = pellets.cells.find(BONUS)
+            while start >= 0:
+                tiles.append(start)
+                start = pellets.cells.find(BONUS, start + 1)
+        for i in tiles:
+            dirty.append(pygame.Rect(i % cols * TILE_SIZE, i // cols * TILE_SIZE, TILE_SIZE, TILE_SIZE))
+        tiles.clear()
+
+        bounds = surface.get_rect()
+        dirty = [r.clip(bounds) for r in dirty]
+
+        # Восстанавливаем фон и монеты под грязными областями
+        for rect in dirty:
+            surface.blit(layer, rect, rect)
+            for y in range(rect.top // TILE_SIZE, (rect.bottom - 1) // TILE_SIZE + 1):
+                for x in range(rect.left // TILE_SIZE, (rect.right - 1) // TILE_SIZE + 1):
+                    if 0 <= y < pellets.rows and 0 <= x < cols:
+                        kind = pellets.cells[y * cols + x]
+                        if kind:
+                            draw_pellet(surface, x, y, kind, state.tick)
+        if timer: timer("walls")
+
+        # Персонажи целиком лежат внутри своих новых областей
+        draw_ghosts(surface, state.ghosts, positions[1:])
+        draw_player(surface, state.player, positions[0])
+        if timer: timer("sprites")
+
+        if hud != self.hud or HUD_RECT.collidelist(dirty) >= 0:
+            self.hud = hud
+            surface.blit(layer, HUD_RECT, HUD_RECT)
+            draw_hud(surface, state, high_score, font)
+            dirty.append(HUD_RECT.copy())
+            if timer: timer("hud")
+
+        return dirty
+
+
+# --- БОЛЬШИЕ КАРТЫ ---
+CHUNK_TILES = 16  # Сторона куска слоя стен в клетках
+
+
+class ChunkCache:
+    """Слой стен большой карты кусками CHUNK_TILES x CHUNK_TILES клеток.
+
+    Кусок рисуется, когда впервые попадает в кадр; хранятся max_chunks последних (LRU),
+    поэтому ни память, ни время кадра не зависят от размера карты.
+    """
+    def __init__(self, max_chunks=64): # noqa
+        self.max_chunks = max_chunks
+        self.chunks = OrderedDict()
+        self.grid = None
+
+    def invalidate(self):
+        self.chunks.clear()
+
+    def get(self, grid, cx, cy):
+        if grid is not self.grid:
+            self.grid = grid
+            self.chunks.clear()
+        chunk = self.chunks.get((cx, cy))
+        if chunk is None:
+            chunk = self.chunks[cx, cy] = self.render(grid, cx, cy)
+            if len(self.chunks) > self.max_chunks:
+                self.chunks.popitem(last=False)
+        else:
+            self.chunks.move_to_end((cx, cy))
+        return chunk
+
+    @staticmethod
+    def render(grid, cx, cy):
+        size = CHUNK_TILES * TILE_SIZE
+        chunk = pygame.Surface((size, size))
+        chunk.fill(BLACK)
+        x0, y0 = cx * CHUNK_TILES, cy * CHUNK_TILES
+        for y in range(max(y0, 0), min(y0 + CHUNK_TILES, len(grid))):
+            row = grid[y]
+            for x in range(max(x0, 0), min(x0 + CHUNK_TILES, len(row))):
+                if row[x] == '1':
+                    pygame.draw.rect(chunk, BLUE,
+                                     ((x - x0) * TILE_SIZE, (y - y0) * TILE_SIZE, TILE_SIZE, TILE_SIZE),
+                                     border_radius=3)
+        if pygame.display.get_surface() is not None:
+            chunk = chunk.convert()
+        return chunk
+
+
+chunk_cache = ChunkCache()
+
+
+def camera_origin(level, focus, view):
+    """Пиксель карты в левом верхнем углу области view: камера держит focus в центре,
+    но не выходит за края карты"""
+    world_width, world_height = level.cols * TILE_SIZE, level.rows * TILE_SIZE
+    x = min(max(focus[0] + TILE_SIZE // 2 - view.w // 2, 0), max(world_width - view.w, 0))
+    y = min(max(focus[1] + TILE_SIZE // 2 - view.h // 2, 0), max(world_height - view.h, 0))
+    return x, y
+
+
+class ScrollingRenderer:
+    """Отрисовка карты больше окна: камера следует за игроком, рисуется только видимое.
+
+    Кадр рисуется целиком (камера сдвигается почти каждый кадр), но его цена
+    определяется размером области view: видимые куски стен, монеты видимых клеток
+    и персонажи, попавшие в кадр.
+    """
+    def __init__(self, view=VIEWPORT): # noqa
+        self.view = view
+
+    def invalidate(self):
+        pass  # Кадр и так рисуется целиком
+
+    def damage(self, rect):
+        pass
+
+    def draw(self, surface, state, high_score, font, positions=None, timer=None):
+        level, pellets, view = state.level, state.pellets, self.view
+        if positions is None:
+            positions = actor_positions(state)
+        cam_x, cam_y = camera_origin(level, positions[0], view)
+        ox, oy = cam_x - view.x, cam_y - view.y  # Сдвиг из координат карты в координаты кадра
+        surface.set_clip(view)
+
+        # Стены — видимые куски слоя
+        size = CHUNK_TILES * TILE_SIZE
+        for cy in range(cam_y // size, (cam_y + view.h - 1) // size + 1):
+            for cx in range(cam_x // size, (cam_x + view.w - 1) // size + 1):
+                surface.blit(chunk_cache.get(level.grid, cx, cy), (cx * size - ox, cy * size - oy))
+        if timer: timer("walls")
+
+        # Монеты и бонусы только в видимых клетках
+        cols, cells = pellets.cols, pellets.cells
+        for y in range(cam_y // TILE_SIZE, min((cam_y + view.h - 1) // TILE_SIZE + 1, pellets.rows)):
+            row = y * cols
+            for x in range(cam_x // TILE_SIZE, min((cam_x + view.w - 1) // TILE_SIZE + 1, cols)):
+                kind = cells[row + x]
+                if kind:
+                    draw_pellet(surface, x, y, kind, state.tick, ox, oy)
+        pellets.taken.clear()
+        if timer: timer("pellets_draw")
+
+        # Персонажи, попавшие в кадр
+        left, top = cam_x - TILE_SIZE, cam_y - GHOST_SPRITE_HEIGHT
+        right, bottom = cam_x + view.w, cam_y + view.h
+        visible = [(ghost, pos) for ghost, pos in zip(state.ghosts, positions[1:])
+                   if left < pos[0] < right and top < pos[1] < bottom]
+        draw_ghosts(surface, [ghost for ghost, _ in visible], [pos for _, pos in visible], ox, oy)
+        x, y = positions[0]
+        draw_player(surface, state.player, (x - ox, y - oy))
+        surface.set_clip(None)
+        if timer: timer("sprites")
+
+        surface.fill(BLACK, HUD_RECT)
+        draw_hud(surface, state, high_score, font)
+        if timer: timer("hud")
+        return None
+
+
+def renderer_for(level):
+    """Отрисовщик под карту: с частичным обновлением, если карта целиком помещается в кадр"""
+    if level.cols * TILE_SIZE <= VIEWPORT.w and level.rows * TILE_SIZE <= VIEWPORT.h:
+        return DirtyRenderer()
+    return ScrollingRenderer()
+
+
+class ProfilerOverlay:
+    """Таблица процентилей фаз кадра поверх игры (переключается клавишей).
+
+    Текст пересобирается раз в refresh кадров, в остальные кадры выводится готовая поверхность.
+    """
+    def __init__(self, font, refresh=15): # noqa
+        self.font = font
+        self.refresh = refresh
+        self.visible = False
+        self.image = None
+        self.frames = 0
+
+    def toggle(self):
+        self.visible = not self.visible
+        self.image = None
+
+    def draw(self, surface, profiler, pos=(4, 4)):
+        """Выводит таблицу и возвращает занятый ею прямоугольник (None, если скрыта)"""
+        if not self.visible:
+            return None
+        if self.image is None or self.frames >= self.refresh:
+            self.frames = 0
+            self.image = self._render(profiler.summary())
+        self.frames += 1
+        return surface.blit(self.image, pos)
+
+    def _render(self, summary):
+        lines = ["phase         p50    p95    p99 ms"]
+        lines += [f"{name:<11}{p50:>6.2f} {p95:>6.2f} {p99:>6.2f}" for name, (p50, p95, p99) in summary.items()]
+        rendered = [self.font.render(line, True, WHITE) for line in lines]
+        height = self.font.get_linesize()
+        image = pygame.Surface((max(r.get_width() for r in rendered) + 8, height * len(rendered) + 8),
+                               pygame.SRCALPHA)
+        image.fill((0, 0, 0, 190))
+        for i, line in enumerate(rendered):
+            image.blit(line, (4, 4 + i * height))
+        return image
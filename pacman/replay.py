@@ -0,0 +1,251 @@
+"""Запись и воспроизведение партий по журналу ввода.
+
+Партия полностью определяется зерном генератора, сложностью, стартовым счётом
+и направлениями, которые игрок выбирал на тиках. Формат файла (little-endian):
+
+    заголовок  "PMRP", версия (B), сложность (B), зерно (Q), стартовый счёт (I),
+               varint(длина) и строка карты в UTF-8 (см. level_from_spec),
+               varint(число призраков, 0 — по карте; не больше MAX_GHOSTS),
+               флаги (B): бит 0 — векторный движок призраков
+    записи     varint(тиков с прошлой записи), код направления (B)
+    конец      varint(тиков с прошлой записи), END (B), varint(итоговый счёт),
+               отпечаток итогового состояния (DIGEST_SIZE байт, см. state_digest)
+
+Коды направлений — индексы в DIRECTIONS. Запуск без окна:
+
+    python -m pacman.replay FILE [FILE ...] [--until TICK]
+
+Массовая проверка присланных записей — python -m pacman.verify.
+"""
+import argparse
+import hashlib
+import struct
+import sys
+import time
+
+from .settings import FPS
+from .engine import GameState, step
+from .maze import DIRECTIONS
+from .level import level_from_spec
+
+MAGIC = b"PMRP"
+VERSION = 1
+HEADER = struct.Struct("<4sBBQI")
+END = 0xFF
+DIGEST_SIZE = 8
+MAX_GHOSTS = 2048  # Больше призраков в записи не бывает: файл не заставит строить миллионы
+KEYFRAME_TICKS = FPS * 5  # Шаг ключевых кадров (слепков партии) для перемотки назад
+
+
+class ReplayError(ValueError):
+    """Файл не является записью партии или повреждён"""
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, pos):
+    """Возвращает (значение, позиция после него)"""
+    value = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ReplayError("запись обрывается посреди числа")
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class Replay:
+    """Запись партии: параметры старта и ввод по тикам.
+
+    inputs — словарь {номер тика: направление}, где номер тика — state.tick
+    перед вызовом step; length — число тиков партии; level — строка карты;
+    ghosts — число призраков (None — по стартовым позициям карты);
+    vectorized — партия сыграна векторным движком призраков (swarm.py);
+    digest — state_digest итогового состояния (None — партия ещё не закончена).
+    """
+    def __init__(self, difficulty, seed, start_score=0, inputs=None, length=0, final_score=None, # noqa
+                 level="classic", ghosts=None, vectorized=False, digest=None):
+        self.level = level
+        self.ghosts = ghosts
+        self.vectorized = vectorized
+        self._level = None
+        self.difficulty = difficulty
+        self.seed = seed
+        self.start_score = start_score
+        self.inputs = inputs if inputs is not None else {}
+        self.length = length
+        self.final_score = final_score
+        self.digest = digest
+
+    def new_game(self):
+        """Новая партия с теми же параметрами, что у записанной"""
+        if self._level is None:
+            self._level = level_from_spec(self.level)
+        return GameState(self.difficulty, self.start_score, self.seed, self._level, self.ghosts, self.vectorized)
+
+    def input_for(self, tick):
+        return self.inputs.get(tick)
+
+    def to_bytes(self):
+        out = bytearray(HEADER.pack(MAGIC, VERSION, self.difficulty, self.seed, self.start_score))
+        spec = self.level.encode("utf-8")
+        write_varint(out, len(spec))
+        out += spec
+        write_varint(out, self.ghosts or 0)
+        out.append(int(self.vectorized))
+        last = 0
+        for tick in sorted(self.inputs):
+            write_varint(out, tick - last)
+            out.append(DIRECTIONS.index(self.inputs[tick]))
+            last = tick
+        write_varint(out, self.length - last)
+        out.append(END)
+        write_varint(out, self.final_score or 0)
+        out += self.digest or bytes(DIGEST_SIZE)
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        if len(data) < HEADER.size:
+            raise ReplayError("файл короче заголовка")
+        magic, version, difficulty, seed, start_score = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ReplayError("это не запись партии")
+        if version != VERSION:
+            raise ReplayError(f"неподдерживаемая версия записи: {version}")
+
+        length, pos = read_varint(data, HEADER.size)
+        level = data[pos:pos + length].decode("utf-8", errors="replace")
+        pos += length
+        ghosts, pos = read_varint(data, pos)
+        if ghosts > MAX_GHOSTS:
+            raise ReplayError(f"призраков больше {MAX_GHOSTS}")
+        if pos >= len(data):
+            raise ReplayError("файл короче заголовка")
+        vectorized = bool(data[pos] & 1)
+        pos += 1
+
+        inputs = {}
+        tick = 0
+        while True:
+            delta, pos = read_varint(data, pos)
+            if pos >= len(data):
+                raise ReplayError("запись обрывается без конца партии")
+            tick += delta
+            code = data[pos]
+            pos += 1
+            if code == END:
+                break
+            if code >= len(DIRECTIONS):
+                raise ReplayError(f"неизвестный код направления: {code}")
+            inputs[tick] = DIRECTIONS[code]
+        final_score, pos = read_varint(data, pos)
+        digest = bytes(data[pos:pos + DIGEST_SIZE])
+        if len(digest) != DIGEST_SIZE:
+            raise ReplayError("запись обрывается посреди отпечатка состояния")
+        return cls(difficulty, seed, start_score, inputs, tick, final_score, level, ghosts or None, vectorized,
+                   digest)
+
+    def save(self, path):
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+class ReplayRecorder:
+    """Накапливает ввод идущей партии; finish() отдаёт готовую запись"""
+    def __init__(self, state): # noqa
+        ghosts = state.ghost_count if state.ghost_count != len(state.level.ghost_spawns) else None
+        self.replay = Replay(state.difficulty, state.seed, state.score, level=state.level.spec, ghosts=ghosts,
+                             vectorized=state.vectorized)
+
+    def record(self, tick, direction):
+        """Вызывается перед step(state, direction) с tick = state.tick"""
+        if direction is not None:
+            self.replay.inputs[tick] = direction
+
+    def finish(self, state):
+        self.replay.length = state.tick
+        self.replay.final_score = state.score
+        self.replay.digest = state_digest(state)
+        return self.replay
+
+
+def state_digest(state):
+    """Отпечаток состояния партии: хеш байтов её слепка (совпадает у одинаково сыгранных партий)"""
+    return hashlib.blake2b(state.snapshot().to_bytes(), digest_size=DIGEST_SIZE).digest()
+
+
+def simulate(replay, state=None, until=None, keyframes=None):
+    """Прогоняет запись без окна до тика until (по умолчанию до конца) и возвращает состояние.
+
+    state — уже продвинутая партия этой записи, с которой нужно продолжить.
+    keyframes — словарь {тик: слепок}, куда по пути кладутся слепки каждые KEYFRAME_TICKS тиков.
+    """
+    if state is None:
+        state = replay.new_game()
+    end = replay.length if until is None else min(until, replay.length)
+    inputs = replay.inputs
+    while state.tick < end and state.status == "playing":
+        if keyframes is not None and state.tick % KEYFRAME_TICKS == 0 and state.tick not in keyframes:
+            keyframes[state.tick] = state.snapshot()
+        step(state, inputs.get(state.tick))
+    return state
+
+
+def rewind(replay, state, tick, keyframes):
+    """Партия записи на тике tick: от ближайшего более раннего слепка из keyframes
+    (откатом state на месте) или с начала"""
+    start = max((key for key in keyframes if key <= tick), default=None)
+    if start is None:
+        state = replay.new_game()
+    else:
+        state.restore(keyframes[start])
+    return simulate(replay, state, tick, keyframes)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pacman.replay",
+                                     description="Воспроизведение записей партий без окна")
+    parser.add_argument("files", nargs="+", help="файлы записей (.pmr)")
+    parser.add_argument("--until", type=int, default=None, help="остановиться на этом тике")
+    args = parser.parse_args(argv)
+
+    mismatches = 0
+    for path in args.files:
+        try:
+            replay = Replay.load(path)
+        except (OSError, ReplayError) as error:
+            print(f"{path}: не читается: {error}")
+            mismatches += 1
+            continue
+        started = time.perf_counter()
+        state = simulate(replay, until=args.until)
+        elapsed = time.perf_counter() - started
+        rate = state.tick / elapsed if elapsed > 0 else float("inf")
+        engine = "numpy" if replay.vectorized else "python"
+        print(f"{path}: level={replay.level} ghosts={len(state.ghosts)} engine={engine} difficulty={replay.difficulty} seed={replay.seed} ticks={state.tick} "
+              f"status={state.status} score={state.score} ({rate:.0f} ticks/s)")
+        if args.until is None and state.score != replay.final_score:
+            print(f"  счёт не совпадает с записанным: {replay.final_score}")
+            mismatches += 1
+        elif args.until is None and state_digest(state) != replay.digest:
+            print("  итоговое состояние не совпадает с записанным")
+            mismatches += 1
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
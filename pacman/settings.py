@@ -0,0 +1,26 @@
+"""Общие настройки игры: размеры и цвета (карты уровней лежат в assets/maps)"""
+
+# --- НАСТРОЙКИ ---
+TILE_SIZE = 24
+ROWS = 21
+COLS = 20
+WIDTH = TILE_SIZE * COLS
+HEIGHT = TILE_SIZE * ROWS + 40  # +40 для UI
+FPS = 60  # тиков симуляции в секунду (скорости и таймеры заданы в тиках)
+MAX_FPS = 0  # предел частоты кадров во время игры (0 — без ограничения)
+MAX_CATCH_UP_TICKS = 5  # сколько тиков можно догнать за один кадр после подвисания
+
+LOGICAL_WIDTH = 480  # фиксированное логическое разрешение
+LOGICAL_HEIGHT = 576
+
+# --- ЦВЕТА ---
+BLACK = (0, 0, 0)
+BLUE = (33, 33, 222)
+YELLOW = (255, 255, 0)
+WHITE = (255, 255, 255)
+GOLD = (255, 215, 0)
+RED = (255, 0, 0)
+CYAN = (0, 255, 255)
+PINK = (255, 184, 255)
+ORANGE = (255, 184, 82)
+GREEN = (0, 255, 0)
@@ -0,0 +1,262 @@
+"""Слепки партии: быстрое клонирование и откат для ботов с перебором и перемотки.
+
+Слепок хранит состояние плоско: поля партии, игрока и каждого призрака кортежами
+в порядке GAME_FIELDS / PLAYER_FIELDS / GHOST_FIELDS, состояние генератора
+случайных чисел и клетки монет. Клетки не копируются: PelletGrid отдаёт их слепку
+через share() и сам копирует их перед первой записью. Ссылки на карту, индекс
+и характеры призраков не хранятся — они общие у всех копий партии.
+
+    snap = state.snapshot()       # микросекунды, партию можно продолжать
+    state.restore(snap)           # откат к слепку (можно много раз)
+    other = state.clone()         # независимая копия партии
+    data = snap.to_bytes()        # и обратно: Snapshot.from_bytes(data)
+
+Формат байтов (little-endian): "PMSN", версия (B), crc32 списков полей (I),
+затем значение (spec карты, поля партии, генератор, игрок, призраки, монеты,
+рой) в теговой кодировке encode_value.
+"""
+import random
+import struct
+import zlib
+from operator import attrgetter
+
+from .engine import GameState, Player, Ghost, PelletGrid, SpatialHash, personality_table
+from .replay import write_varint, read_varint, ReplayError
+from .settings import COLS, ROWS, CYAN
+
+MAGIC = b"PMSN"
+VERSION = 1
+HEADER = struct.Struct("<4sBI")
+DOUBLE = struct.Struct("<d")
+
+GAME_FIELDS = ("seed", "difficulty", "ghost_speed", "score", "lives", "status", "tick", "ghost_count", "vectorized")
+PLAYER_FIELDS = tuple(name for name in Player.__slots__ if name != "level")
+# Ссылки на общие объекты (карта, индекс, характер, генератор партии, напарник) восстанавливаются отдельно
+GHOST_FIELDS = tuple(name for name in Ghost.__slots__
+                     if name not in ("rng", "level", "maze", "board", "personality", "partner"))
+FIELDS_CRC = zlib.crc32(",".join(GAME_FIELDS + PLAYER_FIELDS + GHOST_FIELDS).encode())
+
+get_game = attrgetter(*GAME_FIELDS)
+get_player = attrgetter(*PLAYER_FIELDS)
+get_ghost = attrgetter(*GHOST_FIELDS)
+
+
+class SnapshotError(ValueError):
+    """Байты не являются слепком партии или слепок не подходит к партии"""
+
+
+class Snapshot:
+    """Неизменяемый слепок партии (создаётся GameState.snapshot())"""
+    __slots__ = ("level", "game", "rng", "player", "ghosts", "pellets", "swarm", "template")
+
+    def __init__(self, level, game, rng, player, ghosts, pellets, swarm=None, template=None): # noqa
+        self.level = level
+        self.game = game
+        self.rng = rng
+        self.player = player
+        self.ghosts = ghosts
+        self.pellets = pellets  # (клетки, монет осталось, бонусов осталось)
+        self.swarm = swarm  # GhostArrays.save() векторного движка
+        self.template = template  # GhostArrays, с которого делаются копии для clone()
+
+    @property
+    def tick(self):
+        return self.game[GAME_FIELDS.index("tick")]
+
+    def to_bytes(self):
+        out = bytearray(HEADER.pack(MAGIC, VERSION, FIELDS_CRC))
+        cells, coins, bonuses = self.pellets
+        encode_value(out, (self.level.spec, self.game, self.rng, self.player, self.ghosts,
+                           (bytes(cells), coins, bonuses), self.swarm))
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data):
+        from .level import level_from_spec
+        if len(data) < HEADER.size:
+            raise SnapshotError("данные короче заголовка")
+        magic, version, crc = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise SnapshotError("это не слепок партии")
+        if version != VERSION or crc != FIELDS_CRC:
+            raise SnapshotError("слепок от другой версии игры")
+        try:
+            value, pos = decode_value(data, HEADER.size)
+        except (ReplayError, struct.error, IndexError, UnicodeDecodeError) as error:
+            raise SnapshotError(f"слепок повреждён: {error}")
+        if pos != len(data):
+            raise SnapshotError("слепок повреждён: лишние байты в конце")
+        spec, game, rng, player, ghosts, (cells, coins, bonuses), swarm = value
+        level = level_from_spec(spec)
+        template = None
+        if swarm is not None:
+            seed, difficulty, ghost_speed, _, _, _, _, ghost_count, vectorized = game
+            template = GameState(difficulty, seed=seed, level=level, ghost_count=ghost_count, vectorized=True,
+                                 ghost_speed=ghost_speed).swarm
+        return cls(level, game, rng, player, ghosts, (bytearray(cells), coins, bonuses), swarm, template)
+
+
+# --- СЛЕПОК, ОТКАТ, КОПИЯ ---
+def take_snapshot(state):
+    pellets = state.pellets
+    swarm = state.swarm
+    return Snapshot(state.level, get_game(state), state.rng.getstate(), get_player(state.player),
+                    None if swarm is not None else tuple(map(get_ghost, state.ghosts)),
+                    (pellets.share(), pellets.coins_left, pellets.bonuses_left),
+                    swarm.save() if swarm is not None else None, swarm)
+
+
+def restore(state, snap):
+    """Возвращает партию state к слепку snap той же карты и числа призраков"""
+    ghosts = len(snap.ghosts) if snap.swarm is None else len(snap.swarm[0][0])
+    if state.level.digest != snap.level.digest or (state.swarm is None) != (snap.swarm is None) or \
+            len(state.ghosts) != ghosts:
+        raise SnapshotError("слепок снят с другой партии (карта или призраки не совпадают)")
+    for name, value in zip(GAME_FIELDS, snap.game):
+        setattr(state, name, value)
+    state.events.clear()
+    state.rng.setstate(snap.rng)
+    player = state.player
+    for name, value in zip(PLAYER_FIELDS, snap.player):
+        setattr(player, name, value)
+
+    pellets = state.pellets
+    pellets.cells, pellets.coins_left, pellets.bonuses_left = snap.pellets
+    pellets.shared = True
+    pellets.taken = []
+
+    if snap.swarm is not None:
+        state.swarm.load(snap.swarm)
+        return state
+    for ghost, values in zip(state.ghosts, snap.ghosts):
+        for name, value in zip(GHOST_FIELDS, values):
+            setattr(ghost, name, value)
+    state.ghost_index = SpatialHash(state.level.cols, state.ghosts)
+    return state
+
+
+def blank_state(snap):
+    """Партия с объектами под слепок snap, но без значений полей (их заполнит restore)"""
+    level = snap.level
+    state = GameState.__new__(GameState)
+    state.level = level
+    state.events = []
+    state.rng = random.Random(0)  # Состояние заменит restore; зерно — чтобы не читать os.urandom
+    state.player = Player.__new__(Player)
+    state.player.level = level
+    pellets = state.pellets = PelletGrid.__new__(PelletGrid)
+    pellets.rows, pellets.cols = level.rows, level.cols
+    if snap.swarm is not None:
+        state.swarm = snap.template.copy()
+        state.ghosts = state.swarm.views
+        state.ghost_index = None
+        return state
+
+    state.swarm = None
+    maze = level.index
+    board = (max(COLS, level.cols), max(ROWS, level.rows))
+    table = personality_table(*board)
+    state.ghosts = ghosts = []
+    normal = GHOST_FIELDS.index("normal_color")
+    for i, values in enumerate(snap.ghosts):
+        ghost = Ghost.__new__(Ghost)
+        ghost.rng, ghost.level, ghost.maze, ghost.board = state.rng, level, maze, board
+        ghost.personality = table.get(values[normal])
+        ghost.partner = ghosts[i - i % 4] if values[normal] == CYAN else None  # Blinky той же четвёрки
+        ghosts.append(ghost)
+    return state
+
+
+def clone(state):
+    snap = take_snapshot(state)
+    return restore(blank_state(snap), snap)
+
+
+# --- КОДИРОВАНИЕ ЗНАЧЕНИЙ ---
+# Теги: None, True, False, целое (zigzag varint), float, str, bytes, кортеж, список, словарь, массив NumPy
+NONE, TRUE, FALSE, INT, FLOAT, STR, BYTES, TUPLE, LIST, DICT, ARRAY = b"NTFifsbtlda"
+
+
+def encode_value(out, value):
+    """Дописывает значение в out (кортежи, списки и словари — рекурсивно)"""
+    if value is None:
+        out.append(NONE)
+    elif value is True or value is False:
+        out.append(TRUE if value else FALSE)
+    elif isinstance(value, int):
+        out.append(INT)
+        write_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+    elif isinstance(value, float):
+        out.append(FLOAT)
+        out += DOUBLE.pack(value)
+    elif isinstance(value, str):
+        out.append(STR)
+        encode_bytes(out, value.encode("utf-8"))
+    elif isinstance(value, (bytes, bytearray)):
+        out.append(BYTES)
+        encode_bytes(out, value)
+    elif isinstance(value, (tuple, list)):
+        out.append(TUPLE if isinstance(value, tuple) else LIST)
+        write_varint(out, len(value))
+        for item in value:
+            encode_value(out, item)
+    elif isinstance(value, dict):
+        out.append(DICT)
+        write_varint(out, len(value))
+        for key, item in value.items():
+            encode_value(out, key)
+            encode_value(out, item)
+    elif hasattr(value, "dtype"):  # Массив NumPy: тип, форма, байты
+        out.append(ARRAY)
+        encode_value(out, (value.dtype.str, value.shape))
+        encode_bytes(out, value.tobytes())
+    else:
+        # Числа NumPy (np.int64 и т. п.) — как обычные
+        encode_value(out, value.item())
+
+
+def encode_bytes(out, data):
+    write_varint(out, len(data))
+    out += data
+
+
+def decode_value(data, pos):
+    """Возвращает (значение, позиция после него)"""
+    tag = data[pos]
+    pos += 1
+    if tag == NONE:
+        return None, pos
+    if tag in (TRUE, FALSE):
+        return tag == TRUE, pos
+    if tag == INT:
+        value, pos = read_varint(data, pos)
+        return (value >> 1) ^ -(value & 1), pos
+    if tag == FLOAT:
+        return DOUBLE.unpack_from(data, pos)[0], pos + DOUBLE.size
+    if tag in (STR, BYTES):
+        length, pos = read_varint(data, pos)
+        if pos + length > len(data):
+            raise ReplayError("данные обрываются")
+        raw = bytes(data[pos:pos + length])
+        return raw.decode("utf-8") if tag == STR else raw, pos + length
+    if tag in (TUPLE, LIST):
+        length, pos = read_varint(data, pos)
+        items = []
+        for _ in range(length):
+            item, pos = decode_value(data, pos)
+            items.append(item)
+        return tuple(items) if tag == TUPLE else items, pos
+    if tag == DICT:
+        length, pos = read_varint(data, pos)
+        items = {}
+        for _ in range(length):
+            key, pos = decode_value(data, pos)
+            items[key], pos = decode_value(data, pos)
+        return items, pos
+    if tag == ARRAY:
+        import numpy as np
+        (dtype, shape), pos = decode_value(data, pos)
+        length, pos = read_varint(data, pos)
+        array = np.frombuffer(data, dtype=dtype, count=length // np.dtype(dtype).itemsize, offset=pos)
+        return array.reshape(shape).copy(), pos + length
+    raise ReplayError(f"неизвестный тег {tag}")
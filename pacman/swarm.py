@@ -0,0 +1,452 @@
+"""Векторный движок призраков: состояние всех призраков в массивах NumPy.
+
+Позиции, направления, состояния и таймеры хранятся столбцами (по массиву на поле),
+и тик продвигает всех призраков сразу несколькими операциями над массивами.
+Правила те же, что у engine.Ghost (scatter/chase/frightened, съеденные идут домой
+по полю направлений, порталы), цели выбираются по таблицам MazeIndex.
+
+Отличия от скалярного движка: случайные числа берутся из своего генератора NumPy,
+а все призраки решают по положению на начало тика (Inky видит Blinky, ещё
+не сделавшего шаг). Поэтому партии одного зерна в двух движках не совпадают,
+и записи хранят, каким движком сыграна партия. Нужен NumPy; карта — с таблицами
+для всех пар клеток (не больше level.MAX_TABLE_NODES проходимых клеток).
+"""
+import copy
+
+import numpy as np
+
+from .settings import TILE_SIZE, ROWS, COLS, FPS, WHITE, BLUE, RED, PINK, CYAN, ORANGE
+from .maze import VECTORS, STOP_CODE, NO_DIRECTION, UNREACHABLE, LazyMazeIndex
+from .engine import personality_table
+
+SCATTER, CHASE, FRIGHTENED, EATEN, RESPAWNING = range(5)
+STATE_NAMES = ("scatter", "chase", "frightened", "eaten", "respawning")
+DIRECT, AMBUSH, MIRROR, RANDOM = range(4)
+CHASE_MODES = {"direct": DIRECT, "ambush": AMBUSH, "mirror": MIRROR, "random": RANDOM}
+COLORS = (RED, PINK, CYAN, ORANGE)
+
+DX = np.array([dx for dx, _ in VECTORS])
+DY = np.array([dy for _, dy in VECTORS])
+OPPOSITE = np.array([1, 0, 3, 2, STOP_CODE])
+CODES = np.arange(4)
+FAR = 1 << 30  # «Расстояние» запрещённых направлений
+# Массивы, которые сохраняет слепок: всё, что меняется по ходу партии, и скорости (они случайны
+# у лишних призраков роя); остальные задаются картой и характерами
+SAVED = ("grid_x", "grid_y", "pix_x", "pix_y", "code", "state", "state_timer", "frightened_timer",
+         "respawn_timer", "active", "last_decision_cell", "portal_cooldown", "last_portal", "base_speed", "speed")
+
+
+class GhostView:
+    """Призрак роя для отрисовки и столкновений: читает свою строку массивов GhostArrays"""
+    __slots__ = ("arrays", "number")
+    frightened_color = BLUE
+
+    def __init__(self, arrays, number): # noqa
+        self.arrays = arrays
+        self.number = number
+
+    @property
+    def pix_x(self):
+        return float(self.arrays.pix_x[self.number])
+
+    @property
+    def pix_y(self):
+        return float(self.arrays.pix_y[self.number])
+
+    @property
+    def grid_x(self):
+        return int(self.arrays.grid_x[self.number])
+
+    @property
+    def grid_y(self):
+        return int(self.arrays.grid_y[self.number])
+
+    @property
+    def state(self):
+        return STATE_NAMES[self.arrays.state[self.number]]
+
+    @property
+    def direction(self):
+        return VECTORS[self.arrays.code[self.number]]
+
+    @property
+    def normal_color(self):
+        return self.arrays.colors[self.number]
+
+    @property
+    def color(self):
+        state = self.arrays.state[self.number]
+        if state == FRIGHTENED:
+            return BLUE
+        if state >= EATEN:
+            return WHITE  # Как у Ghost: белым остаётся до возрождения
+        return self.arrays.colors[self.number]
+
+    @property
+    def wave_offset(self):
+        return self.arrays.wave_offset
+
+    def handle_eaten(self):
+        self.arrays.eat(self.number)
+
+
+class GhostArrays:
+    """Все призраки партии столбцами массивов.
+
+    spawns — стартовая клетка каждого призрака, colors — его цвет (определяет характер),
+    speeds — базовая скорость, seed — зерно генератора случайных чисел роя.
+    games — номер партии каждого призрака (по неубыванию), если в массивах лежат призраки
+    нескольких партий сразу (batch.BatchGames); по умолчанию все из одной партии 0.
+    """
+    def __init__(self, level, spawns, colors, speeds, seed, games=None): # noqa
+        index = level.index
+        if isinstance(index, LazyMazeIndex):
+            raise ValueError(f"векторный движок требует таблиц для всех пар клеток, а в карте "
+                             f"{level.name} слишком много проходимых клеток")
+        self.level = level
+        self.cols = level.cols
+        self.rng = np.random.default_rng(seed)
+        self.n = n = len(spawns)
+        self.colors = list(colors)
+        self.game = np.zeros(n, dtype=np.int64) if games is None else np.asarray(games, dtype=np.int64)
+
+        # Карта по клеткам и таблицы индекса (таблицы — представления тех же буферов, без копирования)
+        self.moves = np.frombuffer(level.moves, dtype=np.uint8).astype(np.int64)
+        self.nodes = np.frombuffer(index.node, dtype=np.intc).astype(np.int64)
+        self.nearest = np.frombuffer(index.nearest, dtype=np.intc).astype(np.int64)
+        self.dist = np.frombuffer(index.dist, dtype=np.uint16)
+        self.next_hop = np.frombuffer(index.next_hop, dtype=np.uint8)
+        self.size = index.size
+        self.portal_code = np.full(level.rows * level.cols, NO_DIRECTION, dtype=np.int64)
+        self.portal_exit = np.zeros(level.rows * level.cols, dtype=np.int64)
+        for cell, (code, exit_cell) in level.portal_exits.items():
+            self.portal_code[cell] = code
+            self.portal_exit[cell] = exit_cell
+
+        # Характеры — те же общие таблицы, что у engine.Ghost
+        table = personality_table(max(COLS, level.cols), max(ROWS, level.rows))
+        people = [table[color] for color in colors]
+        self.scatter_x = np.array([p.scatter_pos[0] for p in people])
+        self.scatter_y = np.array([p.scatter_pos[1] for p in people])
+        self.scatter_ticks = np.array([p.scatter_ticks for p in people])
+        self.chase_ticks = np.array([p.chase_ticks for p in people])
+        self.mode = np.array([CHASE_MODES[p.chase_mode] for p in people])
+        self.base_speed = np.array(speeds, dtype=np.float64)
+        self.speed = self.base_speed * np.array([p.speed_boost for p in people])
+        # Inky отражает цель от Blinky своей четвёрки (четвёрки считаются внутри партии)
+        number = np.arange(n)
+        slot = number - np.searchsorted(self.game, self.game)
+        cyan = np.array([color == CYAN for color in colors], dtype=bool)
+        self.partner = np.where(cyan, number - slot % len(COLORS), -1)
+
+        self.start_x = np.array([x for x, _ in spawns])
+        self.start_y = np.array([y for _, y in spawns])
+        self.start_node = self.node_at(self.start_x, self.start_y)
+        self.grid_x = self.start_x.copy()
+        self.grid_y = self.start_y.copy()
+        self.pix_x = self.grid_x * float(TILE_SIZE)
+        self.pix_y = self.grid_y * float(TILE_SIZE)
+        self.code = self.random_codes(self.moves[self.grid_y * self.cols + self.grid_x])
+        self.state = np.full(n, SCATTER)
+        self.state_timer = np.zeros(n, dtype=np.int64)
+        self.frightened_timer = np.zeros(n, dtype=np.int64)
+        self.respawn_timer = np.zeros(n, dtype=np.int64)
+        self.active = np.ones(n, dtype=bool)
+        self.last_decision_cell = self.grid_y * self.cols + self.grid_x
+        self.portal_cooldown = np.zeros(n, dtype=np.int64)
+        self.last_portal = np.full(n, -1)
+        self.wave_offset = 0  # У всех призраков волна идёт в ногу
+        self.views = [GhostView(self, i) for i in range(n)]
+
+    # --- СЛЕПКИ ---
+    def save(self):
+        """Копия изменяемого состояния: (массивы SAVED, состояние генератора, фаза волны)"""
+        return (tuple(getattr(self, name).copy() for name in SAVED), self.rng.bit_generator.state,
+                self.wave_offset)
+
+    def load(self, saved):
+        """Возвращает состояние, сохранённое save() (массивы заполняются на месте)"""
+        arrays, rng_state, self.wave_offset = saved
+        for name, array in zip(SAVED, arrays):
+            np.copyto(getattr(self, name), array)
+        self.rng.bit_generator.state = rng_state
+
+    def copy(self):
+        """Независимая копия: таблицы карты и характеров общие, изменяемые массивы свои"""
+        other = copy.copy(self)
+        for name in SAVED:
+            setattr(other, name, getattr(self, name).copy())
+        other.rng = copy.deepcopy(self.rng)
+        other.views = [GhostView(other, i) for i in range(self.n)]
+        return other
+
+    def node_at(self, x, y):
+        """Номера ближайших проходимых клеток (как MazeIndex.node_at) для массивов координат"""
+        x = np.clip(x, 0, self.cols - 1)
+        y = np.clip(y, 0, self.level.rows - 1)
+        return self.nearest[y * self.cols + x]
+
+    def random_codes(self, masks):
+        """Случайный разрешённый код для каждой маски ходов (STOP_CODE, если ходов нет)"""
+        keys = self.rng.random((len(masks), 4))
+        keys[(masks[:, None] >> CODES & 1) == 0] = -1.0
+        codes = keys.argmax(axis=1)
+        codes[masks == 0] = STOP_CODE
+        return codes
+
+    # --- ТИК ---
+    def step(self, player_x, player_y, player_code):
+        """Продвигает всех призраков на тик (то же, что Ghost.update для каждого).
+
+        player_x, player_y, player_code — клетка и код направления игрока по партиям
+        (последовательности длиной в число партий).
+        """
+        self.wave_offset += 0.2
+        game = self.game
+        player_x, player_y, player_code = (np.asarray(v)[game] for v in (player_x, player_y, player_code))
+        state = self.state
+        eaten = np.flatnonzero(state == EATEN)
+        respawning = np.flatnonzero(state == RESPAWNING)
+        normal = np.flatnonzero((state <= FRIGHTENED) & self.active)
+        if len(eaten):
+            self.return_to_home(eaten)
+        if len(respawning):
+            self.respawn_timer[respawning] -= 1
+            self.reset(respawning[self.respawn_timer[respawning] <= 0])
+        if len(normal):
+            self.update_states(normal)
+            self.grid_x[normal] = np.rint(self.pix_x[normal] / TILE_SIZE)
+            self.grid_y[normal] = np.rint(self.pix_y[normal] / TILE_SIZE)
+            deciding = normal[self.at_center(normal)]
+            if len(deciding):
+                self.make_decisions(deciding, player_x, player_y, player_code)
+            self.move(normal)
+            self.handle_portals(normal)
+
+    def at_center(self, idx):
+        return ((np.abs(self.pix_x[idx] - self.grid_x[idx] * TILE_SIZE) < 2) &
+                (np.abs(self.pix_y[idx] - self.grid_y[idx] * TILE_SIZE) < 2))
+
+    def update_states(self, idx):
+        """Таймеры scatter/chase/frightened"""
+        state = self.state
+        scared = state[idx] == FRIGHTENED
+        calm, scared = idx[~scared], idx[scared]
+        self.frightened_timer[scared] -= 1
+        calmed = scared[self.frightened_timer[scared] <= 0]
+        state[calmed] = CHASE
+        self.state_timer[calmed] = 0
+
+        self.state_timer[calm] += 1
+        timer = self.state_timer[calm]
+        to_chase = calm[(state[calm] == SCATTER) & (timer > self.scatter_ticks[calm])]
+        to_scatter = calm[(state[calm] == CHASE) & (timer > self.chase_ticks[calm])]
+        state[to_chase] = CHASE
+        state[to_scatter] = SCATTER
+        self.state_timer[to_chase] = 0
+        self.state_timer[to_scatter] = 0
+
+    def make_decisions(self, idx, player_x, player_y, player_code):
+        gx, gy = self.grid_x[idx], self.grid_y[idx]
+        self.last_decision_cell[idx] = gy * self.cols + gx
+        masks = self.moves[gy * self.cols + gx]
+        keep = masks != 0
+        idx, gx, gy, masks = idx[keep], gx[keep], gy[keep], masks[keep]
+
+        # Запрет разворота на 180° (если есть другие варианты)
+        opposite = OPPOSITE[self.code[idx]]
+        reverse = (masks >> opposite & 1 == 1) & (masks & (masks - 1) != 0)
+        masks[reverse] &= ~(1 << opposite[reverse])
+
+        # Испуганные бродят случайно
+        scared = self.state[idx] == FRIGHTENED
+        if scared.any():
+            self.code[idx[scared]] = self.random_codes(masks[scared])
+            idx, gx, gy, masks = idx[~scared], gx[~scared], gy[~scared], masks[~scared]
+        if len(idx):
+            tx, ty = self.targets(idx, gx, gy, player_x[idx], player_y[idx], player_code[idx])
+            self.code[idx] = self.codes_towards(gx, gy, masks, tx, ty)
+
+    def targets(self, idx, gx, gy, px, py, pcode):
+        """Цели призраков idx: угол разбегания или цель погони по характеру.
+
+        px, py, pcode — клетка и код направления игрока для каждого из призраков idx.
+        """
+        mode = self.mode[idx]
+        tx, ty = px.copy(), py.copy()
+
+        ambush = mode == AMBUSH
+        tx[ambush] += DX[pcode[ambush]] * 4
+        ty[ambush] += DY[pcode[ambush]] * 4
+
+        partner = self.partner[idx]
+        mirror = (mode == MIRROR) & (partner >= 0)
+        blinky = partner[mirror]
+        red = self.state[blinky] <= CHASE  # Красный цвет — только в scatter и chase
+        mirrored = np.flatnonzero(mirror)[red]
+        tx[mirrored] = 2 * px[mirrored] - self.grid_x[blinky[red]]
+        ty[mirrored] = 2 * py[mirrored] - self.grid_y[blinky[red]]
+
+        # Clyde убегает в свой угол, если подошёл ближе 8 клеток
+        shy = mode == RANDOM
+        if shy.any():
+            near = self.dist[self.node_at(gx[shy], gy[shy]) * self.size + self.node_at(px[shy], py[shy])] < 8
+            shy[shy] = near
+
+        scatter = (self.state[idx] == SCATTER) | shy
+        tx[scatter] = self.scatter_x[idx[scatter]]
+        ty[scatter] = self.scatter_y[idx[scatter]]
+        return tx, ty
+
+    def codes_towards(self, gx, gy, masks, tx, ty):
+        """Коды направлений из масок, ведущих к целям кратчайшим путём (как Ghost.code_towards)"""
+        size = self.size
+        targets = self.node_at(tx, ty)
+        hops = self.next_hop[self.node_at(gx, gy) * size + targets].astype(np.int64)
+        allowed = (hops < 4) & (masks >> np.minimum(hops, 4) & 1 == 1)
+        codes = np.where(allowed, hops, STOP_CODE)
+
+        rest = np.flatnonzero(~allowed)
+        if len(rest):
+            gx, gy, masks, tx, ty = gx[rest, None], gy[rest, None], masks[rest, None], tx[rest, None], ty[rest, None]
+            nx, ny = gx + DX[:4], gy + DY[:4]
+            open_ = masks >> CODES & 1 == 1
+            dist = self.dist[self.node_at(nx, ny) * size + targets[rest, None]].astype(np.int64)
+            dist[~open_] = FAR
+            best = dist.min(axis=1)
+            # Цель недостижима — идём к ней по прямой
+            far = best == UNREACHABLE
+            if far.any():
+                straight = (nx[far] - tx[far]) ** 2 + (ny[far] - ty[far]) ** 2
+                straight[~open_[far]] = FAR
+                dist[far] = straight
+                best[far] = straight.min(axis=1)
+            keys = self.rng.random(dist.shape)
+            keys[dist != best[:, None]] = -1.0
+            codes[rest] = keys.argmax(axis=1)
+        return codes
+
+    def move(self, idx):
+        speed = np.where(self.state[idx] == FRIGHTENED, self.speed[idx] * 0.5, self.speed[idx])
+        code = self.code[idx]
+        self.pix_x[idx] += DX[code] * speed
+        self.pix_y[idx] += DY[code] * speed
+
+    def handle_portals(self, idx):
+        cooling = self.portal_cooldown[idx] > 0
+        self.portal_cooldown[idx[cooling]] -= 1
+        idx = idx[~cooling]
+        idx = idx[self.at_center(idx)]
+        cells = self.grid_y[idx] * self.cols + self.grid_x[idx]
+        portal = self.portal_code[cells]
+        on_portal = portal != NO_DIRECTION
+        fresh = on_portal & (cells != self.last_portal[idx])
+        self.last_portal[idx[on_portal & ~fresh]] = -1
+
+        # Уходим за край карты: появляемся на клетку дальше выхода, продолжая движение
+        leaving = fresh & (portal == self.code[idx])
+        go, code, exits = idx[leaving], portal[leaving], self.portal_exit[cells[leaving]]
+        self.grid_x[go] = exits % self.cols + DX[code]
+        self.grid_y[go] = exits // self.cols + DY[code]
+        across = DX[code] != 0
+        self.pix_x[go[across]] = self.grid_x[go[across]] * float(TILE_SIZE)
+        self.pix_y[go[~across]] = self.grid_y[go[~across]] * float(TILE_SIZE)
+        self.last_portal[go] = exits
+        self.portal_cooldown[go] = 15
+
+    def return_to_home(self, idx):
+        """Съеденные идут домой по полю направлений (как Ghost.return_to_home)"""
+        cells = self.grid_y[idx] * self.cols + self.grid_x[idx]
+        deciding = self.at_center(idx) & ((cells != self.last_decision_cell[idx]) | (self.code[idx] == STOP_CODE))
+        stay = np.zeros(len(idx), dtype=bool)
+        if deciding.any():
+            d, cells_d = idx[deciding], cells[deciding]
+            self.last_decision_cell[d] = cells_d
+            self.pix_x[d] = self.grid_x[d] * float(TILE_SIZE)
+            self.pix_y[d] = self.grid_y[d] * float(TILE_SIZE)
+
+            # Уже дома — ждём возрождения
+            home = (self.grid_x[d] == self.start_x[d]) & (self.grid_y[d] == self.start_y[d])
+            self.state[d[home]] = RESPAWNING
+            self.respawn_timer[d[home]] = 180
+
+            nodes = self.nodes[cells_d]
+            raw = np.where(nodes >= 0, self.next_hop[np.maximum(nodes, 0) * self.size + self.start_node[d]],
+                           NO_DIRECTION).astype(np.int64)
+            self.code[d[~home]] = np.where(raw == NO_DIRECTION, STOP_CODE, raw)[~home]
+
+            # Шаг через портал — сразу переносимся на противоположный край
+            portal = self.portal_code[cells_d]
+            jump = ~home & (portal != NO_DIRECTION) & (portal == raw)
+            exits = self.portal_exit[cells_d[jump]]
+            jumped = d[jump]
+            self.grid_x[jumped] = exits % self.cols
+            self.grid_y[jumped] = exits // self.cols
+            self.pix_x[jumped] = self.grid_x[jumped] * float(TILE_SIZE)
+            self.pix_y[jumped] = self.grid_y[jumped] * float(TILE_SIZE)
+            self.last_decision_cell[jumped] = exits
+            stay[np.flatnonzero(deciding)[home | jump]] = True
+
+        # Двигаемся с увеличенной скоростью (x2)
+        moving = idx[~stay]
+        speed = self.base_speed[moving] * 2
+        code = self.code[moving]
+        self.pix_x[moving] += DX[code] * speed
+        self.pix_y[moving] += DY[code] * speed
+        self.grid_x[moving] = np.rint(self.pix_x[moving] / TILE_SIZE)
+        self.grid_y[moving] = np.rint(self.pix_y[moving] / TILE_SIZE)
+
+    def restart(self, games):
+        """Возвращает призраков партий, отмеченных в маске games, в начальное состояние"""
+        idx = np.flatnonzero(games[self.game])
+        self.reset(idx)
+        self.state_timer[idx] = 0
+        self.frightened_timer[idx] = 0
+        self.respawn_timer[idx] = 0
+        self.last_decision_cell[idx] = self.start_y[idx] * self.cols + self.start_x[idx]
+        self.portal_cooldown[idx] = 0
+        self.last_portal[idx] = -1
+
+    def reset(self, idx):
+        """Возрождение в стартовой клетке"""
+        if not len(idx):
+            return
+        self.grid_x[idx] = self.start_x[idx]
+        self.grid_y[idx] = self.start_y[idx]
+        self.pix_x[idx] = self.grid_x[idx] * float(TILE_SIZE)
+        self.pix_y[idx] = self.grid_y[idx] * float(TILE_SIZE)
+        self.state[idx] = SCATTER
+        self.active[idx] = True
+        self.code[idx] = self.random_codes(self.moves[self.grid_y[idx] * self.cols + self.grid_x[idx]])
+
+    # --- СОБЫТИЯ ---
+    def frighten(self, duration, games=None):
+        """Энерджайзер: все, кроме съеденных, пугаются и с вероятностью 1/2 разворачиваются.
+
+        games — маска партий, где съеден энерджайзер (по умолчанию все).
+        """
+        scared = self.state != EATEN
+        if games is not None:
+            scared &= games[self.game]
+        idx = np.flatnonzero(scared)
+        self.state[idx] = FRIGHTENED
+        self.frightened_timer[idx] = duration * FPS
+        turn = idx[self.rng.random(len(idx)) > 0.5]
+        self.code[turn] = OPPOSITE[self.code[turn]]
+
+    def eat(self, number):
+        self.state[number] = EATEN
+        self.active[number] = False
+        self.respawn_timer[number] = 0
+        self.last_decision_cell[number] = -1
+
+    def touching(self, x, y, size):
+        """Номера призраков, чей прямоугольник (со сдвигом 4 пикселя) пересекает (x, y, size, size)"""
+        return np.flatnonzero(self.touching_mask(np.array([int(x)]), np.array([int(y)]), size)).tolist()
+
+    def touching_mask(self, x, y, size):
+        """То же маской по призракам; x, y — целые левые верхние углы игрока по партиям"""
+        x, y = x[self.game], y[self.game]
+        gx = (self.pix_x + 4).astype(np.int64)
+        gy = (self.pix_y + 4).astype(np.int64)
+        return (x < gx + size) & (gx < x + size) & (y < gy + size) & (gy < y + size)
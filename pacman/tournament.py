@@ -0,0 +1,297 @@
+"""Турнир: перебор характеров призраков и сложностей на пуле процессов.
+
+Каждая конфигурация (набор переопределений характеров, сложность, скорость
+призраков) играется против бота одинаковым набором зёрен, партии раздаются
+рабочим процессам по одной. Упавший или зависший процесс перезапускается,
+а его партия засчитывается в отчёте как сбой (crashed / timeout) — остальные
+партии это не задевает. Запуск:
+
+    python -m pacman.tournament --agent greedy --games 200 --difficulty 1 2 3 \\
+        --set Blinky.speed_boost=1.0,1.1 --set Clyde.chase_mode=random,direct
+
+Отчёт по конфигурациям: доля побед, время жизни, счёт, монет в минуту, число
+оборванных по --max-ticks партий и сбоев; --output пишет его в JSON. Доля побед,
+время жизни и счёт считаются только по доигранным партиям: оборванная партия
+не проиграна, и её длина — это предел, а не время жизни.
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from multiprocessing.connection import wait
+
+from .settings import FPS
+from .engine import GameState, step, set_personalities, PERSONALITY_FIELDS, CHASE_MODES, DEFAULT_PERSONALITIES
+from .level import level_from_spec
+from .agents import load_agent
+
+MAX_TICKS = FPS * 60 * 10  # Партия длиннее 10 минут игрового времени обрывается
+GHOST_NAMES = tuple(name for name, *_ in DEFAULT_PERSONALITIES.values())
+_levels = {}  # Карты, уже собранные в этом процессе
+
+
+class Task:
+    """Одна партия: номер конфигурации, её параметры и зерно"""
+    __slots__ = ("number", "config", "seed", "agent", "level", "ghosts", "max_ticks")
+
+    def __init__(self, number, config, seed, agent, level, ghosts, max_ticks): # noqa
+        self.number = number
+        self.config = config
+        self.seed = seed
+        self.agent = agent
+        self.level = level
+        self.ghosts = ghosts
+        self.max_ticks = max_ticks
+
+
+def play(task):
+    """Играет партию задачи и возвращает её итоги словарём"""
+    config = task.config
+    set_personalities(config["personalities"])
+    level = _levels.get(task.level)
+    if level is None:
+        level = _levels[task.level] = level_from_spec(task.level)
+    agent = load_agent(task.agent)(task.seed, level)
+    state = GameState(config["difficulty"], seed=task.seed, level=level, ghost_count=task.ghosts,
+                      ghost_speed=config["ghost_speed"])
+    pellets = state.pellets.remaining
+    while state.status == "playing" and state.tick < task.max_ticks:
+        step(state, agent(state))
+    return {"status": state.status, "ticks": state.tick, "score": state.score,
+            "pellets": pellets - state.pellets.remaining}
+
+
+def worker_main(conn, handler=play):
+    """Цикл рабочего процесса: получает задачи по каналу, пока не придёт None, и отвечает handler(задача)"""
+    while True:
+        task = conn.recv()
+        if task is None:
+            return
+        try:
+            result = handler(task)
+        except Exception: # noqa
+            result = {"status": "error", "error": traceback.format_exc(limit=3)}
+        conn.send(result)
+
+
+class Worker:
+    """Рабочий процесс с каналом и задачей, которую он сейчас играет"""
+    def __init__(self, context, handler=play): # noqa
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=worker_main, args=(child, handler), daemon=True)
+        self.process.start()
+        child.close()
+        self.task = None
+        self.started = 0.0
+
+    def give(self, task):
+        self.task = task
+        self.started = time.monotonic()
+        self.conn.send(task)
+
+    def kill(self):
+        self.process.kill()
+        self.process.join()
+        self.conn.close()
+
+    def close(self):
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(1)
+        if self.process.is_alive():
+            self.kill()
+
+
+def run_tasks(tasks, workers, timeout, on_result=None, handler=play):
+    """Раздаёт задачи рабочим процессам; возвращает пары (задача, итоги) в порядке завершения.
+
+    tasks — любой итерируемый объект: задачи берутся по одной, когда освобождается
+    процесс, так что в работе их не больше workers. Если задан on_result, итоги
+    отдаются ему и не накапливаются (возвращается пустой список). timeout — секунд
+    на задачу; зависший процесс убивается и заменяется новым, как и упавший.
+    handler — функция, которую процессы вызывают для задачи (по умолчанию play).
+    """
+    context = multiprocessing.get_context()
+    tasks = iter(tasks)
+    pool = []
+    results = []
+
+    def finish(worker, result):
+        if on_result:
+            on_result(worker.task, result)
+        else:
+            results.append((worker.task, result))
+        worker.task = None
+
+    try:
+        while True:
+            for worker in pool:
+                if worker.task is None:
+                    task = next(tasks, None)
+                    if task is not None:
+                        worker.give(task)
+            while len(pool) < workers:  # Процессы запускаются по мере надобности
+                task = next(tasks, None)
+                if task is None:
+                    break
+                pool.append(Worker(context, handler))
+                pool[-1].give(task)
+            busy = [worker for worker in pool if worker.task is not None]
+            if not busy:
+                break
+            deadline = min(worker.started for worker in busy) + timeout
+            wait([w.conn for w in busy] + [w.process.sentinel for w in busy],
+                 max(0.0, deadline - time.monotonic()))
+
+            for number, worker in enumerate(pool):
+                if worker.task is None:
+                    continue
+                try:
+                    if worker.conn.poll():
+                        finish(worker, worker.conn.recv())
+                        continue
+                except (EOFError, OSError):
+                    pass  # Канал закрылся — процесс умер, разбираемся ниже
+                if not worker.process.is_alive():
+                    finish(worker, {"status": "crashed", "exitcode": worker.process.exitcode})
+                elif time.monotonic() - worker.started > timeout:
+                    finish(worker, {"status": "timeout"})
+                else:
+                    continue
+                worker.kill()
+                pool[number] = Worker(context, handler)
+    finally:
+        for worker in pool:
+            worker.close()
+    return results
+
+
+# --- КОНФИГУРАЦИИ И ОТЧЁТ ---
+def parse_setting(text):
+    """"Имя.поле=з1,з2" -> ((имя, поле), [значения]); имя all — для всех призраков"""
+    try:
+        key, values = text.split("=", 1)
+        name, field = key.split(".", 1)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ожидалось Имя.поле=значения, получено {text!r}")
+    if name != "all" and name not in GHOST_NAMES:
+        raise argparse.ArgumentTypeError(f"неизвестный призрак {name!r}: {', '.join(GHOST_NAMES)} или all")
+    if field not in PERSONALITY_FIELDS:
+        raise argparse.ArgumentTypeError(f"неизвестный параметр {field!r}: {', '.join(PERSONALITY_FIELDS)}")
+    values = values.split(",")
+    if field == "chase_mode":
+        bad = set(values) - set(CHASE_MODES)
+        if bad:
+            raise argparse.ArgumentTypeError(f"неизвестные режимы погони: {', '.join(sorted(bad))}")
+        return (name, field), values
+    try:
+        return (name, field), [float(value) for value in values]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"{key}: значения должны быть числами")
+
+
+def configurations(settings, difficulties, ghost_speeds):
+    """Декартово произведение значений параметров, сложностей и скоростей"""
+    keys = [key for key, _ in settings]
+    configs = []
+    for values in itertools.product(*(values for _, values in settings)):
+        for difficulty, ghost_speed in itertools.product(difficulties, ghost_speeds):
+            personalities = {}
+            for (name, field), value in zip(keys, values):
+                for ghost in GHOST_NAMES if name == "all" else (name,):
+                    personalities.setdefault(ghost, {})[field] = value
+            label = " ".join(f"{name}.{field}={value}" for (name, field), value in zip(keys, values))
+            configs.append({"label": label or "default", "personalities": personalities,
+                            "difficulty": difficulty, "ghost_speed": ghost_speed})
+    return configs
+
+
+def summarize(config, outcomes):
+    """Сводка партий одной конфигурации (games — доигранные, truncated — оборванные по max_ticks)"""
+    finished = [o for o in outcomes if o["status"] in ("win", "game_over")]
+    played = finished + [o for o in outcomes if o["status"] == "playing"]  # Темп сбора есть и у оборванных
+    games = len(finished)
+    seconds = sum(o["ticks"] for o in played) / FPS
+    return {
+        "config": config["label"],
+        "difficulty": config["difficulty"],
+        "ghost_speed": config["ghost_speed"],
+        "games": games,
+        "truncated": len(played) - games,
+        "win_rate": sum(o["status"] == "win" for o in finished) / games if games else 0.0,
+        "survival_s": sum(o["ticks"] for o in finished) / FPS / games if games else 0.0,
+        "score": sum(o["score"] for o in finished) / games if games else 0.0,
+        "pellets_per_min": sum(o["pellets"] for o in played) / (seconds / 60) if seconds else 0.0,
+        "crashed": sum(o["status"] in ("crashed", "error") for o in outcomes),
+        "timeouts": sum(o["status"] == "timeout" for o in outcomes),
+    }
+
+
+def print_report(rows):
+    print(f"{'конфигурация':<40} {'сл.':>3} {'скор.':>5} {'игр':>5} {'обрыв':>5} {'побед':>6} {'жизнь, с':>8} "
+          f"{'счёт':>7} {'монет/мин':>9} {'сбои':>5}")
+    for row in rows:
+        speed = "-" if row["ghost_speed"] is None else f"{row['ghost_speed']:.2f}"
+        print(f"{row['config'][:40]:<40} {row['difficulty']:>3} {speed:>5} {row['games']:>5} {row['truncated']:>5} "
+              f"{row['win_rate']:>6.1%} {row['survival_s']:>8.1f} {row['score']:>7.0f} "
+              f"{row['pellets_per_min']:>9.1f} {row['crashed'] + row['timeouts']:>5}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pacman.tournament",
+                                     description="Перебор характеров призраков и сложностей против бота")
+    parser.add_argument("--agent", default="greedy", help="бот: random, greedy, search (search:iterations=N — повторяемый перебор) или модуль:фабрика")
+    parser.add_argument("--games", type=int, default=100, help="партий на конфигурацию")
+    parser.add_argument("--difficulty", type=int, nargs="+", choices=(1, 2, 3), default=[2])
+    parser.add_argument("--ghost-speed", type=float, nargs="+", default=[None],
+                        help="базовая скорость призраков (по умолчанию — по сложности)")
+    parser.add_argument("--set", type=parse_setting, action="append", default=[], dest="settings",
+                        metavar="ИМЯ.ПОЛЕ=З1,З2", help=f"значения параметра характера ({', '.join(PERSONALITY_FIELDS)})")
+    parser.add_argument("--map", default="classic", help="карта (как у pac-man.py --map)")
+    parser.add_argument("--ghosts", type=int, default=None, help="число призраков")
+    parser.add_argument("--seed", type=int, default=0, help="зерно первой партии")
+    parser.add_argument("--max-ticks", type=int, default=MAX_TICKS, help="обрывать партии длиннее")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="рабочих процессов")
+    parser.add_argument("--timeout", type=float, default=60.0, help="секунд на партию")
+    parser.add_argument("--output", default=None, help="записать отчёт в JSON")
+    args = parser.parse_args(argv)
+    if args.games < 1 or args.workers < 1:
+        parser.error("--games и --workers должны быть не меньше 1")
+    try:
+        load_agent(args.agent)
+    except (ValueError, ImportError, AttributeError) as error:
+        parser.error(str(error))
+
+    configs = configurations(args.settings, args.difficulty, args.ghost_speed)
+    tasks = [Task(number, config, args.seed + game, args.agent, args.map, args.ghosts, args.max_ticks)
+             for number, config in enumerate(configs) for game in range(args.games)]
+    print(f"{len(configs)} конфигураций x {args.games} партий, {args.workers} процессов", file=sys.stderr)
+
+    started = time.perf_counter()
+    results = run_tasks(tasks, args.workers, args.timeout)
+    elapsed = time.perf_counter() - started
+
+    outcomes = [[] for _ in configs]
+    for task, result in results:
+        outcomes[task.number].append(result)
+        if result["status"] == "error":
+            print(f"партия {task.seed} ({configs[task.number]['label']}): ошибка\n{result['error']}", file=sys.stderr)
+    rows = [summarize(config, outcome) for config, outcome in zip(configs, outcomes)]
+    print_report(rows)
+    print(f"{len(tasks)} партий за {elapsed:.1f} с ({len(tasks) / elapsed:.1f} партий/с)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"agent": args.agent, "map": args.map, "games_per_config": args.games,
+                       "elapsed_s": elapsed, "results": rows}, f, ensure_ascii=False, indent=2)
+    return 1 if any(row["crashed"] or row["timeouts"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,177 @@
+"""Проверка присланных записей: пересчёт партий без окна на пуле процессов.
+
+Счёт в файле рекорда клиент пишет сам, поэтому доверять можно только записи
+партии (replay.py): партия заново проигрывается по её вводу, и итоговые счёт
+и отпечаток состояния (state_digest) сверяются с записанными. Принимаются только
+доигранные (победа или конец жизней) партии с нулевым стартовым счётом: запись
+следующего уровня не ссылается на предыдущий, так что перенесённый счёт проверить
+нельзя. Карты ограничены (MAX_MAP_CELLS; число призраков — MAX_GHOSTS в replay.py), а карт
+в процессе хранится не больше LEVEL_CACHE — память рабочих не растёт от потока
+записей с разными картами. Запуск:
+
+    python -m pacman.verify replays/ other.pmr --workers 8 --output report.jsonl
+    find uploads -name '*.pmr' | python -m pacman.verify -
+
+Источники — файлы, папки (обходятся рекурсивно) или "-" (пути со стандартного
+ввода). Пути читаются и раздаются процессам по одному, итоги сразу пишутся
+в отчёт (по строке JSON на запись) и не копятся, так что память не растёт
+с числом записей. Сводка — на stderr; код выхода 1, если хоть одна запись отклонена.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from collections import OrderedDict
+
+from .engine import GameState
+from .level import level_from_spec, MAPS_DIR
+from .mazegen import MIN_SIZE
+from .replay import Replay, ReplayError, simulate, state_digest
+from .tournament import run_tasks
+
+REPLAY_SUFFIX = ".pmr"
+MAX_MAP_CELLS = 512 * 512  # Сгенерированные карты крупнее не проверяются
+LEVEL_CACHE = 8  # Карт в памяти процесса
+_levels = OrderedDict()  # Карты, уже собранные в этом процессе (последняя использованная — в конце)
+
+
+def map_problem(spec):
+    """Почему карту spec нельзя проверять (None — можно): годятся стандартная, сгенерированная
+    не меньше MIN_SIZE по сторонам и не крупнее MAX_MAP_CELLS клеток и файлы из assets/maps
+    (не произвольный путь)"""
+    if not spec or spec == "classic":
+        return None
+    if spec.startswith("gen:"):
+        try:
+            _, size, seed = spec.split(":")
+            cols, rows = (int(v) for v in size.lower().split("x"))
+            int(seed)
+        except ValueError:
+            return f"неверная карта {spec!r}"
+        if cols < MIN_SIZE or rows < MIN_SIZE:
+            return f"карта {spec} меньше {MIN_SIZE}x{MIN_SIZE}"
+        if cols * rows > MAX_MAP_CELLS:
+            return f"карта {spec} больше {MAX_MAP_CELLS} клеток"
+        return None
+    if os.sep in spec or (os.altsep and os.altsep in spec) or spec.startswith(".") or \
+            not os.path.exists(os.path.join(MAPS_DIR, spec + ".txt")):
+        return f"карта не из набора игры: {spec!r}"
+    return None
+
+
+def get_level(spec):
+    """Карта из кэша процесса (не больше LEVEL_CACHE последних)"""
+    level = _levels.get(spec)
+    if level is not None:
+        _levels.move_to_end(spec)
+        return level
+    level = _levels[spec] = level_from_spec(spec)
+    if len(_levels) > LEVEL_CACHE:
+        _levels.popitem(last=False)
+    return level
+
+
+def check(path):
+    """Проигрывает запись path и сверяет итоги; verdict — accepted или rejected (с причиной в reason)"""
+    result = {"verdict": "rejected", "reason": None}
+    try:
+        replay = Replay.load(path)
+    except (OSError, ReplayError) as error:
+        result["reason"] = f"не читается: {error}"
+        return result
+    result["claimed"] = replay.final_score
+    if replay.difficulty not in (1, 2, 3):
+        result["reason"] = f"неизвестная сложность {replay.difficulty}"
+        return result
+    if replay.digest is None or not any(replay.digest):
+        result["reason"] = "нет отпечатка состояния"  # Без него сверить можно только счёт
+        return result
+    if replay.start_score:
+        result["reason"] = "партия начата не с нуля: счёт предыдущих уровней не проверить"
+        return result
+    problem = map_problem(replay.level)
+    if problem is not None:
+        result["reason"] = problem
+        return result
+    try:
+        level = get_level(replay.level)
+    except ValueError as error:  # MapError и отказ генератора лабиринтов
+        result["reason"] = f"карта: {error}"
+        return result
+
+    state = GameState(replay.difficulty, replay.start_score, replay.seed, level, replay.ghosts, replay.vectorized)
+    simulate(replay, state)
+    result.update(score=state.score, ticks=state.tick, status=state.status)
+    if state.tick != replay.length:
+        result["reason"] = f"партия кончилась на тике {state.tick}, а запись длится {replay.length}"
+    elif state.status not in ("win", "game_over"):
+        result["reason"] = "партия не доиграна"
+    elif state.score != replay.final_score:
+        result["reason"] = "счёт не совпадает с записанным"
+    elif state_digest(state) != replay.digest:
+        result["reason"] = "итоговое состояние не совпадает с записанным"
+    else:
+        result["verdict"] = "accepted"
+    return result
+
+
+def replay_paths(sources, stdin=sys.stdin):
+    """Пути записей из источников по одному, без составления полного списка"""
+    for source in sources:
+        if source == "-":
+            for line in stdin:
+                line = line.strip()
+                if line:
+                    yield line
+        elif os.path.isdir(source):
+            yield from scan(source)
+        else:
+            yield source
+
+
+def scan(folder):
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                yield from scan(entry.path)
+            elif entry.name.endswith(REPLAY_SUFFIX):
+                yield entry.path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m pacman.verify",
+                                     description="Проверка записей партий пересчётом без окна")
+    parser.add_argument("sources", nargs="+", help="файлы записей, папки с ними или - (пути со стандартного ввода)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="рабочих процессов")
+    parser.add_argument("--timeout", type=float, default=60.0, help="секунд на запись (дольше — отклонена)")
+    parser.add_argument("--output", default="-", help="отчёт JSON Lines (по умолчанию — на stdout)")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers должно быть не меньше 1")
+
+    counts = {"accepted": 0, "rejected": 0}
+    report = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+
+    def on_result(path, result):
+        if "verdict" not in result:  # Процесс упал, завис или проверка бросила исключение
+            result = {"verdict": "rejected", "reason": result["status"], "error": result.get("error")}
+        counts[result["verdict"]] += 1
+        report.write(json.dumps({"file": path, **result}, ensure_ascii=False) + "\n")
+
+    started = time.perf_counter()
+    try:
+        run_tasks(replay_paths(args.sources), args.workers, args.timeout, on_result, handler=check)
+    finally:
+        if report is not sys.stdout:
+            report.close()
+    elapsed = time.perf_counter() - started
+
+    total = counts["accepted"] + counts["rejected"]
+    print(f"{total} записей за {elapsed:.1f} с ({total / elapsed if elapsed > 0 else 0:.1f} записей/с): "
+          f"принято {counts['accepted']}, отклонено {counts['rejected']}", file=sys.stderr)
+    return 1 if counts["rejected"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())